@@ -1,21 +1,48 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends, File, UploadFile, Form
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends, File, UploadFile, Form, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
+import posixpath
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import base64
 import hashlib
+import json
+import mimetypes
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from xml.sax.saxutils import escape as xml_escape, quoteattr
 import jwt
+import markdown
+import nh3
+import numpy as np
+import scipy.sparse as sp
 import aiofiles
 import shutil
+import asyncio
+import itertools
+import difflib
+import heapq
+import zlib
+from collections import OrderedDict
+import time
+import bisect
+import math
+import unicodedata
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -29,6 +56,111 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 (UPLOAD_DIR / "videos").mkdir(exist_ok=True)
 (UPLOAD_DIR / "portfolio").mkdir(exist_ok=True)
 
+# Partial state for resumable uploads
+UPLOAD_SESSION_DIR = UPLOAD_DIR / "partial"
+UPLOAD_SESSION_DIR.mkdir(exist_ok=True)
+
+# Scratch space for single-request uploads while they are hashed
+UPLOAD_TMP_DIR = UPLOAD_DIR / "tmp"
+UPLOAD_TMP_DIR.mkdir(exist_ok=True)
+
+# Media storage backend: "local" (files under UPLOAD_DIR) or "s3" (any S3-compatible store, e.g. MinIO)
+MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE', 'local')
+S3_BUCKET = os.environ.get('S3_BUCKET')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+S3_REGION = os.environ.get('S3_REGION')
+S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')  # public/CDN base URL; presigned URLs are used otherwise
+S3_URL_EXPIRY = 60 * 60  # seconds
+
+# Upload limits
+MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 500 * 1024 * 1024))  # 500 MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+UPLOAD_SESSION_TTL_HOURS = int(os.environ.get('UPLOAD_SESSION_TTL_HOURS', 24))
+UPLOAD_SESSION_GC_INTERVAL = 60 * 60  # seconds
+
+ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/gif", "image/webp"]
+ALLOWED_VIDEO_TYPES = ["video/mp4", "video/mpeg", "video/quicktime", "video/x-msvideo"]
+
+# Image derivatives: variant name -> longest edge in pixels
+IMAGE_VARIANT_SIZES = {"thumbnail": 320, "medium": 800, "large": 1600}
+MEDIA_PROCESS_WORKERS = int(os.environ.get('MEDIA_PROCESS_WORKERS', 2))
+
+# Video transcoding jobs
+FFMPEG_PATH = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+FFPROBE_PATH = os.environ.get('FFPROBE_PATH', 'ffprobe')
+MEDIA_JOB_WORKERS = int(os.environ.get('MEDIA_JOB_WORKERS', 1))
+MEDIA_JOB_FFMPEG_THREADS = int(os.environ.get('MEDIA_JOB_FFMPEG_THREADS', 2))
+MEDIA_JOB_MAX_ATTEMPTS = 3
+MEDIA_JOB_POLL_INTERVAL = 60  # seconds; new jobs also wake the workers directly
+MEDIA_JOB_LEASE_SECONDS = 5 * 60  # a running job whose lease is not renewed in time is taken over
+HLS_SEGMENT_SECONDS = 6
+# (height, video bitrate, audio bitrate); renditions taller than the source are skipped
+HLS_LADDER = [(360, "800k", "96k"), (720, "2800k", "128k"), (1080, "5000k", "192k")]
+mimetypes.add_type("video/mp2t", ".ts")
+
+# Media serving
+MAX_BYTE_RANGES = 16
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+# Upload subdirectories that hold in-progress data and must never be served
+PRIVATE_UPLOAD_DIRS = {"partial", "tmp"}
+# Orphan reconciliation
+RECONCILE_BATCH_SIZE = 500
+RECONCILE_GRACE_SECONDS = 60 * 60  # newer files may belong to uploads still in progress
+RECONCILE_SAMPLE_LIMIT = 100
+MANAGED_UPLOAD_DIRS = ["images", "videos", "variants", "hls"]
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+UUID_FILENAME_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(\.\w+)?$')
+# Blog facets; writes in this process invalidate at once, the TTL bounds staleness across processes
+BLOG_FACETS_TTL = int(os.environ.get('BLOG_FACETS_TTL', 5 * 60))  # seconds
+# Public blog response cache
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))  # seconds
+# Blog content rendering; bump the version when the output changes so stored HTML is re-rendered
+BLOG_RENDERER_VERSION = 2
+BLOG_MARKDOWN_EXTENSIONS = ["extra", "sane_lists"]
+BLOG_HTML_TAGS = {
+    "a", "abbr", "blockquote", "br", "code", "dd", "del", "div", "dl", "dt", "em", "h1", "h2", "h3",
+    "h4", "h5", "h6", "hr", "img", "li", "ol", "p", "pre", "span", "strong", "sub", "sup", "table",
+    "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+BLOG_HTML_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "abbr": {"title"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "td": {"align"},
+    "th": {"align"},
+    # Heading anchors and footnotes; values are namespaced with BLOG_HTML_ID_PREFIX
+    **{tag: {"id"} for tag in ("h1", "h2", "h3", "h4", "h5", "h6", "li", "sup")},
+}
+# Keeps author ids from shadowing DOM globals (e.g. window.location) or the page's own ids
+BLOG_HTML_ID_PREFIX = "user-content-"
+# Related posts
+RELATED_TOP_K = 10
+RELATED_TAG_WEIGHT = 0.3  # share of the relatedness score given to tag overlap
+RELATED_HASH_FEATURES = 2 ** 18
+RELATED_REBUILD_AFTER_WRITES = 20
+# View counting and popularity
+VIEW_FLUSH_INTERVAL = int(os.environ.get('VIEW_FLUSH_INTERVAL', 5))  # seconds of views at risk on a crash
+POPULAR_HALF_LIFE_HOURS = float(os.environ.get('POPULAR_HALF_LIFE_HOURS', 72))
+# In-process blog state (search index, feeds, related posts) catches up with writes made by other processes
+BLOG_STATE_SYNC_INTERVAL = int(os.environ.get('BLOG_STATE_SYNC_INTERVAL', 10))  # seconds
+# Revision history: every Nth revision of a post is stored whole, the rest as line deltas
+REVISION_SNAPSHOT_INTERVAL = int(os.environ.get('REVISION_SNAPSHOT_INTERVAL', 20))
+REVISION_FIELDS = (
+    "title", "excerpt", "tags", "category", "featured_image", "featured_video",
+    "paper_type", "academic_info", "language", "published", "publish_at",
+)
+# Bulk import/export
+IMPORT_BATCH_SIZE = 200
+IMPORT_MAX_LINE_BYTES = 16 * 1024 * 1024
+IMPORT_MAX_REPORTED_ERRORS = 1000
+EXPORT_BATCH_SIZE = 100
+# Blog feeds
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:3000').rstrip('/')
+FEED_TITLE = "Benjamin Kyamoneka Mpey - Insights & Research"
+FEED_MAX_ENTRIES = int(os.environ.get('FEED_MAX_ENTRIES', 50))
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
@@ -37,9 +169,6 @@ db = client[os.environ['DB_NAME']]
 # Create the main app without a prefix
 app = FastAPI(title="Benjamin Kyamoneka Mpey Portfolio API")
 
-# Mount static files for serving uploads
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
-
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -75,12 +204,72 @@ class MediaFile(BaseModel):
     category: str = "general"  # profile, hero, background, blog, video
     description: Optional[str] = None
     is_active: bool = True
+    content_hash: Optional[str] = None  # sha256 of the stored bytes, shared via db.media_blobs
+    variants: Dict[str, str] = {}  # e.g. thumbnail, thumbnail_webp, medium, ... -> url
+    hls_manifest: Optional[str] = None
+    poster_path: Optional[str] = None
+    transcode_status: Optional[str] = None  # queued, running, completed, failed
+    # Extracted metadata, filled in shortly after upload
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: Optional[int] = None  # EXIF orientation of the original (1 = upright)
+    duration: Optional[float] = None  # seconds, videos only
+    dominant_color: Optional[str] = None  # "#rrggbb" placeholder while the image loads
 
 class MediaFileUpdate(BaseModel):
     category: Optional[str] = None
     description: Optional[str] = None
     is_active: Optional[bool] = None
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    content_type: str
+    total_size: int
+    category: str = "general"
+    description: Optional[str] = None
+
+class UploadSession(BaseModel):
+    upload_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    filename: str
+    content_type: str
+    total_size: int
+    offset: int = 0
+    category: str = "general"
+    description: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class MediaJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    job_type: str = "hls_transcode"
+    content_hash: str
+    source_path: str
+    status: str = "queued"  # queued, running, completed, failed, cancelled
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    lease_id: Optional[str] = None  # changes on every claim; the running worker's updates are fenced by it
+    lease_expires_at: Optional[datetime] = None
+
+class ReconcileReport(BaseModel):
+    status: str = "idle"  # idle, running, completed, failed, cancelled
+    remove_orphans: bool = False
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    current_prefix: Optional[str] = None
+    files_scanned: int = 0
+    bytes_scanned: int = 0
+    orphaned_files: int = 0
+    orphaned_bytes: int = 0
+    removed_files: int = 0
+    records_checked: int = 0
+    missing_files: int = 0
+    orphan_samples: List[str] = []
+    missing_samples: List[str] = []  # media file ids or blob hashes whose bytes are gone
+    error: Optional[str] = None
+
 class ContactMessage(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -113,6 +302,40 @@ class BlogPost(BaseModel):
     reading_time: Optional[int] = None
     paper_type: Optional[str] = None
     academic_info: Optional[Dict[str, Any]] = None
+    language: str = "en"
+    content_html: Optional[str] = None
+    content_renderer_version: Optional[int] = None
+    publish_at: Optional[datetime] = None
+    revision: int = 1
+
+class BlogPostSummary(BaseModel):
+    """Blog post without its body, for list views"""
+    id: str
+    title: str
+    excerpt: str
+    author: str = "Benjamin Kyamoneka Mpey"
+    created_at: datetime
+    updated_at: datetime
+    published: bool = True
+    tags: List[str] = []
+    category: str = "general"
+    featured_image: Optional[str] = None
+    featured_video: Optional[str] = None
+    reading_time: Optional[int] = None
+    paper_type: Optional[str] = None
+    language: str = "en"
+    publish_at: Optional[datetime] = None
+
+# Mongo projection that leaves the heavy fields of a post on the server
+BLOG_SUMMARY_PROJECTION = {"_id": 0, "content": 0, "content_html": 0, "academic_info": 0}
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class BlogFacets(BaseModel):
+    categories: List[FacetCount] = []
+    tags: List[FacetCount] = []
 
 class BlogPostCreate(BaseModel):
     title: str
@@ -120,6 +343,8 @@ class BlogPostCreate(BaseModel):
     excerpt: str
     tags: List[str] = []
     category: str = "general"
+    language: str = "en"
+    publish_at: Optional[datetime] = None  # a future time keeps the post unpublished until then
     featured_image: Optional[str] = None
     featured_video: Optional[str] = None
     paper_type: Optional[str] = None
@@ -136,6 +361,44 @@ class BlogPostUpdate(BaseModel):
     published: Optional[bool] = None
     paper_type: Optional[str] = None
     academic_info: Optional[Dict[str, Any]] = None
+    language: Optional[str] = None
+    publish_at: Optional[datetime] = None
+
+class BlogRevision(BaseModel):
+    post_id: str
+    number: int
+    created_at: datetime
+    kind: str  # snapshot, delta
+    changed_fields: List[str] = []
+    size: int = 0  # bytes of stored content or delta
+
+class BlogRevisionContent(BlogRevision):
+    content: str
+    fields: Dict[str, Any] = {}
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+class BlogImportReport(BaseModel):
+    processed: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ImportLineError] = []  # the first IMPORT_MAX_REPORTED_ERRORS failures
+
+class SearchSnippet(BaseModel):
+    field: str
+    offset: int
+    text: str
+    highlights: List[List[int]] = []
+
+class BlogSearchResult(BaseModel):
+    id: str
+    title: str
+    score: float
+    title_highlights: List[List[int]] = []
+    snippets: List[SearchSnippet] = []
 
 class NewsletterSubscription(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -190,6 +453,787 @@ def calculate_reading_time(content: str) -> int:
     word_count = len(re.findall(r'\w+', content))
     return max(1, round(word_count / 200))
 
+# Utility functions to render blog markdown into sanitized HTML
+def prefix_html_ids(tag: str, attribute: str, value: str) -> Optional[str]:
+    """Namespace ids, and the same-page links that point at them"""
+    if attribute == "id":
+        return BLOG_HTML_ID_PREFIX + value
+    if attribute == "href" and value.startswith("#"):
+        return f"#{BLOG_HTML_ID_PREFIX}{value[1:]}"
+    return value
+
+def render_markdown(content: str) -> str:
+    html = markdown.markdown(content, extensions=BLOG_MARKDOWN_EXTENSIONS, output_format="html")
+    return nh3.clean(
+        html,
+        tags=BLOG_HTML_TAGS,
+        attributes=BLOG_HTML_ATTRIBUTES,
+        attribute_filter=prefix_html_ids,
+        url_schemes={"http", "https", "mailto"},
+        link_rel="noopener noreferrer nofollow",
+    )
+
+async def render_blog_content(content: str) -> Dict[str, Any]:
+    """Fields to store alongside content; long papers are rendered off the event loop"""
+    return {
+        "content_html": await asyncio.to_thread(render_markdown, content),
+        "content_renderer_version": BLOG_RENDERER_VERSION,
+    }
+
+# Utility function to stream an upload to disk in fixed-size chunks
+async def save_upload_file(upload: UploadFile, destination: Path, max_size: int = MAX_UPLOAD_SIZE):
+    """Copy an uploaded file to destination without buffering it in memory, returning (size, sha256)"""
+    file_size = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(destination, 'wb') as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > max_size:
+                    raise HTTPException(status_code=413, detail=f"File exceeds maximum upload size of {max_size} bytes")
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        # Never leave a partially written file behind
+        destination.unlink(missing_ok=True)
+        raise
+    return file_size, digest.hexdigest()
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def resolve_media_type(content_type: str):
+    """Return (file_type, upload_subdir) for an allowed content type"""
+    if content_type in ALLOWED_IMAGE_TYPES:
+        return "image", "images"
+    if content_type in ALLOWED_VIDEO_TYPES:
+        return "video", "videos"
+    raise HTTPException(status_code=400, detail="Unsupported file type")
+
+def get_file_extension(filename: str) -> str:
+    return filename.split('.')[-1] if '.' in filename else ''
+
+# Keyset pagination
+# A cursor is the opaque, url-safe encoding of the sort key values of the last item on a
+# page; the next page is everything strictly after it in sort order, which an index on
+# the sort fields can seek to directly instead of skipping over earlier pages.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: list) -> str:
+    encoded = [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(encoded, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, expected_length: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [
+            datetime.fromisoformat(v["$dt"]) if isinstance(v, dict) else v
+            for v in json.loads(raw)
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if len(values) != expected_length:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def keyset_filter(sort: List[tuple], values: list) -> dict:
+    """Match documents sorting strictly after the given sort key values"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def find_page(collection, query: dict, sort: List[tuple], limit: int,
+                    cursor: Optional[str] = None, projection: Optional[dict] = None):
+    """Return (documents, next_cursor) for one keyset page; the last sort field must be unique"""
+    if limit <= 0:
+        return [], None
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(cursor, len(sort)))]}
+    docs = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1].get(field) for field, _ in sort])
+    return docs, next_cursor
+
+# Request coalescing
+class SingleFlight:
+    """Share one in-flight call among concurrent callers asking for the same key.
+
+    The call runs as its own task, so a caller that goes away does not cancel
+    it for the others. Per-key counters show how much fan-in was absorbed.
+    """
+
+    def __init__(self, max_tracked_keys: int = 1000):
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.metrics: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.max_tracked_keys = max_tracked_keys
+
+    async def do(self, key: str, fn):
+        """Await fn() once for every concurrent caller with the same key"""
+        metrics = self.metrics.pop(key, None) or {"calls": 0, "executions": 0, "shared": 0}
+        self.metrics[key] = metrics
+        if len(self.metrics) > self.max_tracked_keys:
+            self.metrics.popitem(last=False)
+        metrics["calls"] += 1
+        task = self.inflight.get(key)
+        if task is None:
+            metrics["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self.inflight[key] = task
+            task.add_done_callback(lambda done: self.finished(key, done))
+        else:
+            metrics["shared"] += 1
+        return await asyncio.shield(task)
+
+    def finished(self, key: str, task: asyncio.Future):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller has gone
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        calls = sum(m["calls"] for m in self.metrics.values())
+        shared = sum(m["shared"] for m in self.metrics.values())
+        busiest = sorted(self.metrics.items(), key=lambda item: item[1]["shared"], reverse=True)[:top]
+        return {
+            "in_flight": len(self.inflight),
+            "tracked_keys": len(self.metrics),
+            "calls": calls,
+            "executions": calls - shared,
+            "shared": shared,
+            "keys": [{"key": key, **metrics} for key, metrics in busiest if metrics["shared"]],
+        }
+
+read_flights = SingleFlight()
+
+# Media storage backends
+# Stored media is addressed by a key relative to the uploads root (e.g. "images/ab/cd/<uuid>.jpg")
+# and is always exposed to clients as /uploads/<key>, whichever backend holds the bytes.
+# Originals and derivatives are sharded by content-hash prefix so no directory grows unbounded.
+def shard_prefix(sha256: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}"
+
+def variant_prefix(sha256: str) -> str:
+    return f"variants/{shard_prefix(sha256)}/{sha256}"
+
+def hls_prefix(sha256: str) -> str:
+    return f"hls/{shard_prefix(sha256)}/{sha256}"
+
+def storage_key_for(file_path: str) -> str:
+    """Map a /uploads/... URL path to its storage key"""
+    return file_path.removeprefix("/uploads/")
+
+class MediaStorage(ABC):
+    """Interface shared by the storage backends"""
+    
+    @abstractmethod
+    async def save(self, local_path: Path, key: str, content_type: Optional[str] = None):
+        """Store local_path under key; the local file is consumed"""
+    
+    async def save_tree(self, local_dir: Path, prefix: str):
+        """Store every file below local_dir under prefix; the directory is consumed"""
+        for path in sorted(local_dir.rglob("*")):
+            if path.is_file():
+                await self.save(path, f"{prefix}/{path.relative_to(local_dir).as_posix()}")
+        shutil.rmtree(local_dir, ignore_errors=True)
+    
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove the bytes stored under key, if any"""
+    
+    @abstractmethod
+    async def delete_prefix(self, prefix: str):
+        """Remove everything stored below prefix"""
+    
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether anything is stored under key"""
+    
+    @abstractmethod
+    def list_batches(self, prefix: str, batch_size: int):
+        """Async generator yielding lists of (key, size, mtime) for everything under prefix"""
+    
+    @abstractmethod
+    def local_copy(self, key: str):
+        """Async context manager yielding a local path holding the bytes stored under key"""
+    
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path to serve directly from this node, or None when the bytes live elsewhere"""
+        return None
+    
+    @property
+    def supports_hls(self) -> bool:
+        """Whether HLS served from here works: players resolve segment URLs relative to the playlist"""
+        return True
+    
+    @abstractmethod
+    async def url(self, key: str) -> str:
+        """URL clients should be redirected to when local_path() is None"""
+
+class LocalMediaStorage(MediaStorage):
+    def __init__(self, root: Path):
+        self.root = root.resolve()
+    
+    def path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if path == self.root or not path.is_relative_to(self.root):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+    
+    async def save(self, local_path: Path, key: str, content_type: Optional[str] = None):
+        destination = self.path(key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(local_path, destination)
+    
+    async def save_tree(self, local_dir: Path, prefix: str):
+        destination = self.path(prefix)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.rmtree, destination, True)
+        os.replace(local_dir, destination)
+    
+    async def delete(self, key: str):
+        self.path(key).unlink(missing_ok=True)
+    
+    async def delete_prefix(self, prefix: str):
+        await asyncio.to_thread(shutil.rmtree, self.path(prefix), True)
+    
+    async def exists(self, key: str) -> bool:
+        return self.path(key).is_file()
+    
+    async def list_batches(self, prefix: str, batch_size: int):
+        def walk():
+            pending = [self.root / prefix]
+            while pending:
+                try:
+                    entries = os.scandir(pending.pop())
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+                with entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            key = Path(entry.path).relative_to(self.root).as_posix()
+                            yield key, stat.st_size, stat.st_mtime
+        
+        # Walk lazily in a worker thread, one batch at a time, so memory stays bounded
+        entries = walk()
+        while True:
+            batch = await asyncio.to_thread(lambda: list(itertools.islice(entries, batch_size)))
+            if not batch:
+                return
+            yield batch
+    
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        yield self.path(key)
+    
+    def local_path(self, key: str) -> Optional[Path]:
+        return self.path(key)
+    
+    async def url(self, key: str) -> str:
+        return f"/uploads/{key}"
+
+class S3MediaStorage(MediaStorage):
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 public_url: Optional[str] = None):
+        import boto3
+        from botocore.config import Config
+        
+        # Path-style addressing keeps MinIO and other self-hosted endpoints working
+        config = Config(s3={"addressing_style": "path"}) if endpoint_url else None
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=config)
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/") if public_url else None
+    
+    async def save(self, local_path: Path, key: str, content_type: Optional[str] = None):
+        extra_args = {"ContentType": content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"}
+        await asyncio.to_thread(self.client.upload_file, str(local_path), self.bucket, key, ExtraArgs=extra_args)
+        local_path.unlink(missing_ok=True)
+    
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+    
+    async def delete_prefix(self, prefix: str):
+        def delete_all():
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{prefix}/"):
+                objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+                if objects:
+                    self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+        await asyncio.to_thread(delete_all)
+    
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+    
+    async def list_batches(self, prefix: str, batch_size: int):
+        pages = iter(self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=f"{prefix}/", PaginationConfig={"PageSize": batch_size}
+        ))
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return
+            yield [
+                (item["Key"], item["Size"], item["LastModified"].timestamp())
+                for item in page.get("Contents", [])
+            ]
+    
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        local_path = UPLOAD_TMP_DIR / f"{uuid.uuid4()}{Path(key).suffix}"
+        try:
+            await asyncio.to_thread(self.client.download_file, self.bucket, key, str(local_path))
+            yield local_path
+        finally:
+            local_path.unlink(missing_ok=True)
+    
+    @property
+    def supports_hls(self) -> bool:
+        # A presigned playlist URL does not sign the segments next to it, so HLS from a
+        # private bucket needs S3_PUBLIC_URL (a public bucket or CDN)
+        return self.public_url is not None
+    
+    async def url(self, key: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+        return await asyncio.to_thread(
+            self.client.generate_presigned_url,
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=S3_URL_EXPIRY
+        )
+
+def create_media_storage() -> MediaStorage:
+    if MEDIA_STORAGE == "s3":
+        if not S3_BUCKET:
+            raise RuntimeError("S3_BUCKET must be set when MEDIA_STORAGE=s3")
+        return S3MediaStorage(S3_BUCKET, S3_ENDPOINT_URL, S3_REGION, S3_PUBLIC_URL)
+    return LocalMediaStorage(UPLOAD_DIR)
+
+media_storage = create_media_storage()
+
+# Image derivative pipeline
+# Resizing runs in a process pool so large images never block the event loop.
+media_process_pool: Optional[ProcessPoolExecutor] = None
+media_processing_tasks = set()
+
+def get_media_process_pool() -> ProcessPoolExecutor:
+    global media_process_pool
+    if media_process_pool is None:
+        media_process_pool = ProcessPoolExecutor(max_workers=MEDIA_PROCESS_WORKERS)
+    return media_process_pool
+
+def generate_image_variants(source_path: str, output_dir: str):
+    """Runs in a worker process: write resized copies plus WebP versions.
+    
+    Returns (variant -> filename, metadata) so the image is only decoded once.
+    """
+    from PIL import Image, ImageOps
+    
+    os.makedirs(output_dir, exist_ok=True)
+    variants = {}
+    with Image.open(source_path) as source:
+        orientation = source.getexif().get(0x0112, 1)
+        # Animated GIFs are reduced to their first frame
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ("RGBA", "LA", "P")
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        extension, save_format, options = (
+            ("png", "PNG", {"optimize": True}) if has_alpha
+            else ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True})
+        )
+        for name, size in IMAGE_VARIANT_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            resized.save(os.path.join(output_dir, f"{name}.{extension}"), save_format, **options)
+            resized.save(os.path.join(output_dir, f"{name}.webp"), "WEBP", quality=80, method=4)
+            variants[name] = f"{name}.{extension}"
+            variants[f"{name}_webp"] = f"{name}.webp"
+        
+        # Most common colour of a small, palette-reduced copy
+        sample = image.convert("RGB")
+        sample.thumbnail((64, 64))
+        palette_image = sample.quantize(colors=4)
+        palette = palette_image.getpalette()
+        _, index = max(palette_image.getcolors())
+        red, green, blue = palette[index * 3:index * 3 + 3]
+        metadata = {
+            "width": image.width,
+            "height": image.height,
+            "orientation": orientation,
+            "dominant_color": f"#{red:02x}{green:02x}{blue:02x}"
+        }
+    return variants, metadata
+
+async def update_blob_fields(sha256: str, fields: dict) -> bool:
+    """Record derived data on a blob and every MediaFile sharing it"""
+    result = await db.media_blobs.update_one({"sha256": sha256}, {"$set": fields})
+    await db.media_files.update_many({"content_hash": sha256}, {"$set": fields})
+    return result.matched_count > 0
+
+async def process_image_blob(blob: dict):
+    sha256 = blob["sha256"]
+    prefix = variant_prefix(sha256)
+    output_dir = UPLOAD_TMP_DIR / str(uuid.uuid4())
+    loop = asyncio.get_running_loop()
+    try:
+        async with media_storage.local_copy(blob["storage_key"]) as source_path:
+            filenames, metadata = await loop.run_in_executor(
+                get_media_process_pool(), generate_image_variants, str(source_path), str(output_dir)
+            )
+        await media_storage.save_tree(output_dir, prefix)
+    except Exception:
+        logger.exception("Failed to generate image variants for %s", blob["file_path"])
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return
+    
+    variants = {name: f"/uploads/{prefix}/{filename}" for name, filename in filenames.items()}
+    if not await update_blob_fields(sha256, {"variants": variants, **metadata}):
+        # Every reference was deleted while we were working
+        await media_storage.delete_prefix(prefix)
+        return
+    # Cached blog responses may point featured images at the original instead of a variant
+    blog_response_cache.invalidate()
+
+async def process_video_blob(blob: dict):
+    try:
+        async with media_storage.local_copy(blob["storage_key"]) as source_path:
+            info = await probe_video(source_path)
+    except Exception:
+        logger.exception("Failed to read video metadata for %s", blob["file_path"])
+        return
+    await update_blob_fields(blob["sha256"], {
+        "width": info["width"], "height": info["height"], "duration": info["duration"]
+    })
+
+async def schedule_media_processing(blob: dict):
+    if blob["file_type"] == "image":
+        task = asyncio.create_task(process_image_blob(blob))
+    else:
+        if media_storage.supports_hls:
+            await enqueue_transcode_job(blob)
+        # Metadata is cheap to read, so it does not wait behind queued transcodes
+        task = asyncio.create_task(process_video_blob(blob))
+    media_processing_tasks.add(task)
+    task.add_done_callback(media_processing_tasks.discard)
+
+# Video transcoding job queue
+# Jobs live in db.media_jobs so queued work survives restarts. A fixed number of worker
+# tasks claim jobs one at a time; ffmpeg runs as a subprocess with a capped thread count.
+# A claimed job carries a lease that its worker keeps renewing; when a worker or its
+# process dies the lease lapses and any worker, in any process, can claim the job again.
+# Each run writes its output under its own lease id, so published HLS files never change.
+media_job_wakeup = asyncio.Event()
+
+async def enqueue_transcode_job(blob: dict) -> MediaJob:
+    job = MediaJob(content_hash=blob["sha256"], source_path=blob["file_path"])
+    await db.media_jobs.insert_one(job.dict())
+    await update_blob_fields(blob["sha256"], {"transcode_status": "queued"})
+    blob["transcode_status"] = "queued"
+    media_job_wakeup.set()
+    return job
+
+async def run_media_command(*args) -> bytes:
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"{args[0]} exited with {process.returncode}: {stderr.decode(errors='replace')[-2000:]}")
+    return stdout
+
+async def probe_video(source_path: Path) -> dict:
+    output = await run_media_command(
+        FFPROBE_PATH, "-v", "error", "-show_entries", "stream=codec_type,width,height:format=duration",
+        "-of", "json", str(source_path)
+    )
+    probe = json.loads(output)
+    streams = probe.get("streams", [])
+    video = next((stream for stream in streams if stream.get("codec_type") == "video"), None)
+    if video is None:
+        raise RuntimeError("No video stream found")
+    return {
+        "width": video["width"],
+        "height": video["height"],
+        "duration": float(probe.get("format", {}).get("duration") or 0) or None,
+        "has_audio": any(stream.get("codec_type") == "audio" for stream in streams)
+    }
+
+async def transcode_to_hls(source_path: Path, output_dir: Path):
+    """Write an adaptive HLS ladder (master.m3u8) and poster.jpg into output_dir"""
+    info = await probe_video(source_path)
+    renditions = [rung for rung in HLS_LADDER if rung[0] <= info["height"]] or HLS_LADDER[:1]
+    
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir(parents=True)
+    playlist_entries = []
+    for height, video_bitrate, audio_bitrate in renditions:
+        width = round(info["width"] * height / info["height"] / 2) * 2
+        audio_args = ["-c:a", "aac", "-b:a", audio_bitrate, "-ac", "2"] if info["has_audio"] else ["-an"]
+        await run_media_command(
+            FFMPEG_PATH, "-y", "-v", "error", "-i", str(source_path),
+            "-vf", f"scale={width}:{height}", "-c:v", "libx264", "-preset", "veryfast",
+            "-b:v", video_bitrate, "-maxrate", video_bitrate, "-bufsize", video_bitrate,
+            "-g", "48", "-sc_threshold", "0", *audio_args,
+            "-threads", str(MEDIA_JOB_FFMPEG_THREADS),
+            "-hls_time", str(HLS_SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+            "-hls_segment_filename", str(output_dir / f"{height}p_%04d.ts"),
+            str(output_dir / f"{height}p.m3u8")
+        )
+        bandwidth = (int(video_bitrate[:-1]) + (int(audio_bitrate[:-1]) if info["has_audio"] else 0)) * 1000
+        playlist_entries.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height}\n{height}p.m3u8"
+        )
+    
+    await run_media_command(
+        FFMPEG_PATH, "-y", "-v", "error", "-i", str(source_path),
+        "-vf", "thumbnail,scale=-2:'min(720,ih)'", "-frames:v", "1", str(output_dir / "poster.jpg")
+    )
+    async with aiofiles.open(output_dir / "master.m3u8", 'w') as f:
+        await f.write("#EXTM3U\n#EXT-X-VERSION:3\n" + "\n".join(playlist_entries) + "\n")
+
+async def finish_media_job(job: dict, fields: dict) -> bool:
+    """Update a job this worker holds the lease on; False when another worker has taken it over"""
+    result = await db.media_jobs.update_one(
+        {"id": job["id"], "lease_id": job["lease_id"]},
+        {"$set": {**fields, "lease_id": None, "lease_expires_at": None}}
+    )
+    return result.matched_count > 0
+
+async def run_media_job(job: dict):
+    sha256 = job["content_hash"]
+    prefix = f"{hls_prefix(sha256)}/{job['lease_id']}"
+    output_dir = UPLOAD_TMP_DIR / str(uuid.uuid4())
+    blob = await db.media_blobs.find_one({"sha256": sha256}, {"hls_manifest": 1})
+    if not blob:
+        await finish_media_job(job, {"status": "cancelled", "finished_at": datetime.utcnow()})
+        return
+    if not media_storage.supports_hls:
+        # Queued before the storage was switched to one that cannot serve HLS
+        await finish_media_job(job, {
+            "status": "failed", "error": "Storage backend cannot serve HLS", "finished_at": datetime.utcnow()
+        })
+        await update_blob_fields(sha256, {"transcode_status": "failed"})
+        return
+    
+    await update_blob_fields(sha256, {"transcode_status": "running"})
+    try:
+        async with media_storage.local_copy(storage_key_for(job["source_path"])) as source_path:
+            await transcode_to_hls(source_path, output_dir)
+        await media_storage.save_tree(output_dir, prefix)
+    except Exception as e:
+        logger.exception("Transcode job %s failed", job["id"])
+        shutil.rmtree(output_dir, ignore_errors=True)
+        await media_storage.delete_prefix(prefix)
+        retry = job["attempts"] < MEDIA_JOB_MAX_ATTEMPTS
+        if await finish_media_job(job, {
+            "status": "queued" if retry else "failed",
+            "error": str(e),
+            "finished_at": None if retry else datetime.utcnow()
+        }):
+            await update_blob_fields(sha256, {"transcode_status": "queued" if retry else "failed"})
+        return
+    
+    if not await finish_media_job(job, {"status": "completed", "error": None, "finished_at": datetime.utcnow()}):
+        # Our lease lapsed and another run owns the job now; its output is the one to publish
+        await media_storage.delete_prefix(prefix)
+        return
+    updated = await update_blob_fields(sha256, {
+        "hls_manifest": f"/uploads/{prefix}/master.m3u8",
+        "poster_path": f"/uploads/{prefix}/poster.jpg",
+        "transcode_status": "completed"
+    })
+    if not updated:
+        # Every reference was deleted while we were working
+        await media_storage.delete_prefix(prefix)
+        return
+    previous_prefix = posixpath.dirname(storage_key_for(blob.get("hls_manifest") or ""))
+    # Output from before per-run directories sits directly under hls_prefix() and is left
+    # in place, since the new run directory lives inside it
+    if previous_prefix.startswith(f"{hls_prefix(sha256)}/"):
+        await media_storage.delete_prefix(previous_prefix)
+
+async def claim_media_job() -> Optional[dict]:
+    """Lease the oldest job that is queued or whose running worker stopped renewing its lease"""
+    now = datetime.utcnow()
+    return await db.media_jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_expires_at": {"$lt": now}},
+            # Jobs left running by a version without leases
+            {"status": "running", "lease_expires_at": None},
+        ]},
+        {"$set": {
+            "status": "running",
+            "started_at": now,
+            "lease_id": str(uuid.uuid4()),
+            "lease_expires_at": now + timedelta(seconds=MEDIA_JOB_LEASE_SECONDS)
+        }, "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def renew_media_job_lease(job: dict):
+    while True:
+        await asyncio.sleep(MEDIA_JOB_LEASE_SECONDS / 3)
+        result = await db.media_jobs.update_one(
+            {"id": job["id"], "lease_id": job["lease_id"]},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=MEDIA_JOB_LEASE_SECONDS)}}
+        )
+        if not result.matched_count:
+            logger.warning("Lost the lease on media job %s", job["id"])
+            return
+
+async def media_job_worker():
+    while True:
+        # Clear before looking so a job enqueued after the query still wakes us
+        media_job_wakeup.clear()
+        job = await claim_media_job()
+        if job is None:
+            try:
+                await asyncio.wait_for(media_job_wakeup.wait(), timeout=MEDIA_JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        heartbeat = asyncio.create_task(renew_media_job_lease(job))
+        try:
+            await run_media_job(job)
+        except Exception:
+            logger.exception("Media job worker error")
+        finally:
+            heartbeat.cancel()
+
+def select_variant(file_path: str, variants: Dict[str, str], variant: Optional[str]) -> str:
+    if variant and variant in variants:
+        return variants[variant]
+    return file_path
+
+async def apply_featured_image_variant(posts: list, variant: Optional[str]):
+    """Point each post's featured_image at the requested variant when it is an uploaded image"""
+    if not variant:
+        return posts
+    paths = {urlsplit(post.featured_image).path for post in posts if post.featured_image}
+    if not paths:
+        return posts
+    files = await db.media_files.find(
+        {"file_path": {"$in": list(paths)}}, {"file_path": 1, "variants": 1}
+    ).to_list(len(paths))
+    variants_by_path = {f["file_path"]: f.get("variants", {}) for f in files}
+    for post in posts:
+        if not post.featured_image:
+            continue
+        parts = urlsplit(post.featured_image)
+        selected = select_variant(parts.path, variants_by_path.get(parts.path, {}), variant)
+        if selected != parts.path:
+            post.featured_image = parts._replace(path=selected).geturl()
+    return posts
+
+# Content-addressed media storage
+# Identical bytes are stored once. db.media_blobs holds one document per sha256 with the
+# stored file and a ref_count; every MediaFile pointing at it carries the same content_hash.
+async def store_media_blob(temp_path: Path, sha256: str, file_size: int, content_type: str, filename: str) -> dict:
+    """Take a reference on the blob for sha256, moving temp_path into place if it is new"""
+    file_type, upload_subdir = resolve_media_type(content_type)
+    unique_filename = f"{uuid.uuid4()}.{get_file_extension(filename)}"
+    storage_key = f"{upload_subdir}/{shard_prefix(sha256)}/{unique_filename}"
+    new_blob = {
+        "sha256": sha256,
+        "filename": unique_filename,
+        "storage_key": storage_key,
+        "file_path": f"/uploads/{storage_key}",
+        "file_type": file_type,
+        "mime_type": content_type,
+        "file_size": file_size,
+        "created_at": datetime.utcnow()
+    }
+    try:
+        blob = await db.media_blobs.find_one_and_update(
+            {"sha256": sha256},
+            {"$inc": {"ref_count": 1}, "$setOnInsert": new_blob},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent upload of the same bytes inserted the blob first
+        blob = await db.media_blobs.find_one_and_update(
+            {"sha256": sha256},
+            {"$inc": {"ref_count": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    if blob["filename"] == unique_filename:
+        await media_storage.save(temp_path, storage_key, content_type)
+        await schedule_media_processing(blob)
+    else:
+        temp_path.unlink(missing_ok=True)
+    return blob
+
+async def release_media_blob(file_doc: dict):
+    """Drop a MediaFile's reference to its bytes, unlinking them once nothing refers to them"""
+    sha256 = file_doc.get("content_hash")
+    if not sha256:
+        # Records created before deduplication own their file outright
+        await media_storage.delete(storage_key_for(file_doc["file_path"]))
+        return
+    
+    blob = await db.media_blobs.find_one_and_update(
+        {"sha256": sha256},
+        {"$inc": {"ref_count": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if blob is None or blob["ref_count"] > 0:
+        return
+    # Only the caller that removes the blob document unlinks the file, and a concurrent
+    # upload that re-referenced the bytes in the meantime keeps it alive
+    blob = await db.media_blobs.find_one_and_delete({"sha256": sha256, "ref_count": {"$lte": 0}})
+    if blob:
+        await media_storage.delete(blob.get("storage_key") or storage_key_for(blob["file_path"]))
+        await media_storage.delete_prefix(variant_prefix(sha256))
+        await media_storage.delete_prefix(hls_prefix(sha256))
+        await db.media_jobs.update_many(
+            {"content_hash": sha256, "status": "queued"}, {"$set": {"status": "cancelled"}}
+        )
+
+BLOB_DERIVED_FIELDS = [
+    "variants", "hls_manifest", "poster_path", "transcode_status",
+    "width", "height", "orientation", "duration", "dominant_color"
+]
+
+async def create_media_record(blob: dict, original_filename: str, mime_type: str, category: str, description: Optional[str]) -> MediaFile:
+    media_file = MediaFile(
+        filename=blob["filename"],
+        original_filename=original_filename,
+        file_path=blob["file_path"],
+        file_type=blob["file_type"],
+        mime_type=mime_type,
+        file_size=blob["file_size"],
+        category=category,
+        description=description if description else None,
+        content_hash=blob["sha256"],
+        # Derived data already computed for these bytes
+        **{field: blob[field] for field in BLOB_DERIVED_FIELDS if blob.get(field) is not None}
+    )
+    await db.media_files.insert_one(media_file.dict())
+    return media_file
+
 # Admin Authentication Endpoints
 @api_router.post("/admin/login", response_model=Token)
 async def admin_login(login_data: AdminLogin):
@@ -219,54 +1263,43 @@ async def upload_media(
     current_admin: str = Depends(get_current_admin)
 ):
     # Validate file type
-    allowed_image_types = ["image/jpeg", "image/png", "image/gif", "image/webp"]
-    allowed_video_types = ["video/mp4", "video/mpeg", "video/quicktime", "video/x-msvideo"]
+    resolve_media_type(file.content_type)
     
-    if file.content_type not in allowed_image_types + allowed_video_types:
-        raise HTTPException(status_code=400, detail="Unsupported file type")
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"File exceeds maximum upload size of {MAX_UPLOAD_SIZE} bytes")
     
-    # Determine file type and directory
-    if file.content_type in allowed_image_types:
-        file_type = "image"
-        upload_subdir = "images"
-    else:
-        file_type = "video"
-        upload_subdir = "videos"
-    
-    # Generate unique filename
-    file_extension = file.filename.split('.')[-1] if '.' in file.filename else ''
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = UPLOAD_DIR / upload_subdir / unique_filename
-    
-    # Save file
+    # Save file in chunks so large videos are never held in memory, hashing as we go
+    temp_path = UPLOAD_TMP_DIR / str(uuid.uuid4())
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        file_size, sha256 = await save_upload_file(file, temp_path)
+        blob = await store_media_blob(temp_path, sha256, file_size, file.content_type, file.filename)
+    except HTTPException:
+        raise
     except Exception as e:
+        temp_path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
     
-    # Create media record
-    media_file = MediaFile(
-        filename=unique_filename,
-        original_filename=file.filename,
-        file_path=f"/uploads/{upload_subdir}/{unique_filename}",
-        file_type=file_type,
-        mime_type=file.content_type,
-        file_size=len(content),
-        category=category,
-        description=description if description else None
-    )
-    
-    # Save to database
-    await db.media_files.insert_one(media_file.dict())
-    
-    return media_file
+    # Create media record referencing the (possibly shared) stored file
+    return await create_media_record(blob, file.filename, file.content_type, category, description)
 
 @api_router.get("/admin/media", response_model=List[MediaFile])
 async def get_media_files(
+    response: Response,
     file_type: Optional[str] = None,
     category: Optional[str] = None,
+    variant: Optional[str] = None,
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+    min_width: Optional[int] = None,
+    max_width: Optional[int] = None,
+    min_height: Optional[int] = None,
+    max_height: Optional[int] = None,
+    min_duration: Optional[float] = None,
+    max_duration: Optional[float] = None,
+    sort: str = Query(default="upload_date", pattern="^(upload_date|file_size|width|height|duration)$"),
+    order: str = Query(default="desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=500),
     current_admin: str = Depends(get_current_admin)
 ):
     query = {"is_active": True}
@@ -275,8 +1308,157 @@ async def get_media_files(
     if category:
         query["category"] = category
     
-    files = await db.media_files.find(query).sort("upload_date", -1).to_list(100)
-    return [MediaFile(**file) for file in files]
+    for field, low, high in [
+        ("file_size", min_size, max_size),
+        ("width", min_width, max_width),
+        ("height", min_height, max_height),
+        ("duration", min_duration, max_duration),
+    ]:
+        bounds = {}
+        if low is not None:
+            bounds["$gte"] = low
+        if high is not None:
+            bounds["$lte"] = high
+        if bounds:
+            query[field] = bounds
+    # Files whose metadata is not extracted yet cannot be placed in a metadata sort order
+    if sort not in ("upload_date", "file_size"):
+        query.setdefault(sort, {})["$ne"] = None
+    
+    # Pass the X-Next-Cursor response header back as ?cursor= for the next page
+    direction = -1 if order == "desc" else 1
+    page_sort = [(sort, direction), ("id", direction)]
+    files, next_cursor = await read_flights.do(
+        "admin/media:" + json.dumps([query, page_sort, limit, cursor], sort_keys=True, default=str),
+        lambda: find_page(db.media_files, query, page_sort, limit, cursor),
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    media_files = [MediaFile(**file) for file in files]
+    # With ?variant=thumbnail etc. file_path points at that derivative when it exists
+    for media_file in media_files:
+        media_file.file_path = select_variant(media_file.file_path, media_file.variants, variant)
+    return media_files
+
+# Orphaned media reconciliation
+# Walks storage and the media collections in fixed-size batches, so memory does not grow
+# with the size of the library, and yields to the event loop between batches so it can run
+# on a live server. Files younger than RECONCILE_GRACE_SECONDS are never treated as orphans.
+reconcile_report = ReconcileReport()
+reconcile_task: Optional[asyncio.Task] = None
+
+def derivative_owner(key: str) -> Optional[str]:
+    """Content hash owning a variants/ or hls/ key"""
+    return next((part for part in key.split("/")[1:] if SHA256_RE.match(part)), None)
+
+async def find_orphans(batch: List[tuple]) -> List[tuple]:
+    originals = [entry for entry in batch if entry[0].split("/")[0] in ("images", "videos")]
+    derivatives = [entry for entry in batch if entry[0].split("/")[0] in ("variants", "hls")]
+    
+    referenced = set()
+    if originals:
+        keys = [key for key, _, _ in originals]
+        async for blob in db.media_blobs.find({"storage_key": {"$in": keys}}, {"storage_key": 1}):
+            referenced.add(blob["storage_key"])
+        paths = [f"/uploads/{key}" for key in keys if key not in referenced]
+        async for media in db.media_files.find({"file_path": {"$in": paths}}, {"file_path": 1}):
+            referenced.add(storage_key_for(media["file_path"]))
+    
+    live_hashes = set()
+    owners = {derivative_owner(key) for key, _, _ in derivatives} - {None}
+    if owners:
+        async for blob in db.media_blobs.find({"sha256": {"$in": list(owners)}}, {"sha256": 1}):
+            live_hashes.add(blob["sha256"])
+    
+    return [entry for entry in originals if entry[0] not in referenced] + [
+        entry for entry in derivatives if derivative_owner(entry[0]) not in live_hashes
+    ]
+
+async def reconcile_storage(report: ReconcileReport):
+    cutoff = time.time() - RECONCILE_GRACE_SECONDS
+    for prefix in MANAGED_UPLOAD_DIRS:
+        report.current_prefix = prefix
+        async for batch in media_storage.list_batches(prefix, RECONCILE_BATCH_SIZE):
+            report.files_scanned += len(batch)
+            report.bytes_scanned += sum(size for _, size, _ in batch)
+            settled = [entry for entry in batch if entry[2] < cutoff]
+            for key, size, _ in await find_orphans(settled):
+                report.orphaned_files += 1
+                report.orphaned_bytes += size
+                if len(report.orphan_samples) < RECONCILE_SAMPLE_LIMIT:
+                    report.orphan_samples.append(key)
+                if report.remove_orphans:
+                    await media_storage.delete(key)
+                    report.removed_files += 1
+            await asyncio.sleep(0)
+
+async def check_records(report: ReconcileReport, collection, query: dict, label_field: str, key_for):
+    batch = []
+    async for doc in collection.find(query).batch_size(RECONCILE_BATCH_SIZE):
+        batch.append(doc)
+        if len(batch) < RECONCILE_BATCH_SIZE:
+            continue
+        await check_record_batch(report, batch, label_field, key_for)
+        batch = []
+    if batch:
+        await check_record_batch(report, batch, label_field, key_for)
+
+async def check_record_batch(report: ReconcileReport, batch: List[dict], label_field: str, key_for):
+    report.records_checked += len(batch)
+    exists = await asyncio.gather(*[media_storage.exists(key_for(doc)) for doc in batch])
+    for doc, found in zip(batch, exists):
+        if not found:
+            report.missing_files += 1
+            if len(report.missing_samples) < RECONCILE_SAMPLE_LIMIT:
+                report.missing_samples.append(doc[label_field])
+    await asyncio.sleep(0)
+
+async def run_reconciliation(report: ReconcileReport):
+    try:
+        await reconcile_storage(report)
+        report.current_prefix = None
+        # Records pointing at bytes that no longer exist (reported, never removed)
+        await check_records(
+            report, db.media_blobs, {}, "sha256",
+            lambda blob: blob.get("storage_key") or storage_key_for(blob["file_path"])
+        )
+        await check_records(
+            report, db.media_files, {"content_hash": None}, "id",
+            lambda media: storage_key_for(media["file_path"])
+        )
+        report.status = "completed"
+    except asyncio.CancelledError:
+        report.status = "cancelled"
+        raise
+    except Exception as e:
+        logger.exception("Media reconciliation failed")
+        report.status = "failed"
+        report.error = str(e)
+    finally:
+        report.finished_at = datetime.utcnow()
+
+@api_router.post("/admin/media/reconcile", response_model=ReconcileReport)
+async def start_media_reconciliation(
+    remove_orphans: bool = False,
+    current_admin: str = Depends(get_current_admin)
+):
+    """Scan storage for orphaned files and records with missing files; optionally delete the orphans"""
+    global reconcile_report, reconcile_task
+    if reconcile_task is not None and not reconcile_task.done():
+        raise HTTPException(status_code=409, detail="Reconciliation already running")
+    reconcile_report = ReconcileReport(status="running", remove_orphans=remove_orphans, started_at=datetime.utcnow())
+    reconcile_task = asyncio.create_task(run_reconciliation(reconcile_report))
+    return reconcile_report
+
+@api_router.get("/admin/media/reconcile", response_model=ReconcileReport)
+async def get_media_reconciliation(current_admin: str = Depends(get_current_admin)):
+    return reconcile_report
+
+@api_router.delete("/admin/media/reconcile", response_model=ReconcileReport)
+async def cancel_media_reconciliation(current_admin: str = Depends(get_current_admin)):
+    if reconcile_task is not None and not reconcile_task.done():
+        reconcile_task.cancel()
+    return reconcile_report
 
 @api_router.put("/admin/media/{file_id}")
 async def update_media_file(
@@ -304,16 +1486,200 @@ async def delete_media_file(
     if not file_doc:
         raise HTTPException(status_code=404, detail="Media file not found")
     
-    # Delete physical file
-    file_path = Path(str(UPLOAD_DIR)) / file_doc["file_path"].replace("/uploads/", "")
-    if file_path.exists():
-        file_path.unlink()
-    
-    # Delete from database
-    await db.media_files.delete_one({"id": file_id})
+    # Delete from database, then drop the file reference; only the request that
+    # actually removed the record releases it
+    result = await db.media_files.delete_one({"id": file_id})
+    if result.deleted_count:
+        await release_media_blob(file_doc)
     
     return {"message": "Media file deleted successfully"}
 
+@api_router.get("/admin/media/jobs", response_model=List[MediaJob])
+async def get_media_jobs(
+    status: Optional[str] = None,
+    limit: int = Query(default=50, le=200),
+    current_admin: str = Depends(get_current_admin)
+):
+    query = {"status": status} if status else {}
+    jobs = await db.media_jobs.find(query).sort("created_at", -1).to_list(limit)
+    return [MediaJob(**job) for job in jobs]
+
+@api_router.get("/admin/media/jobs/{job_id}", response_model=MediaJob)
+async def get_media_job(job_id: str, current_admin: str = Depends(get_current_admin)):
+    job = await db.media_jobs.find_one({"id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Media job not found")
+    return MediaJob(**job)
+
+@api_router.post("/admin/media/{file_id}/transcode", response_model=MediaJob)
+async def transcode_media_file(file_id: str, current_admin: str = Depends(get_current_admin)):
+    """Queue (or re-queue) HLS transcoding for an uploaded video"""
+    file_doc = await db.media_files.find_one({"id": file_id})
+    if not file_doc:
+        raise HTTPException(status_code=404, detail="Media file not found")
+    if file_doc["file_type"] != "video" or not file_doc.get("content_hash"):
+        raise HTTPException(status_code=400, detail="Only uploaded videos can be transcoded")
+    if not media_storage.supports_hls:
+        raise HTTPException(status_code=409, detail="HLS output needs S3_PUBLIC_URL when media is stored in S3")
+    blob = await db.media_blobs.find_one({"sha256": file_doc["content_hash"]})
+    if not blob:
+        raise HTTPException(status_code=404, detail="Media file not found")
+    return await enqueue_transcode_job(blob)
+
+# Resumable upload endpoints
+# Each session keeps its metadata in <upload_id>.json and the bytes received so far in
+# <upload_id>.part under UPLOAD_SESSION_DIR. The size of the .part file is the
+# authoritative offset, so a client can always resume from what actually hit the disk.
+upload_session_locks: Dict[str, asyncio.Lock] = {}
+
+def upload_session_paths(upload_id: str):
+    # upload ids are server-generated uuids; reject anything else before touching the disk
+    try:
+        upload_id = str(uuid.UUID(upload_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return UPLOAD_SESSION_DIR / f"{upload_id}.json", UPLOAD_SESSION_DIR / f"{upload_id}.part"
+
+async def load_upload_session(upload_id: str) -> UploadSession:
+    meta_path, part_path = upload_session_paths(upload_id)
+    if not meta_path.exists():
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    async with aiofiles.open(meta_path, 'r') as f:
+        session = UploadSession.parse_raw(await f.read())
+    session.offset = part_path.stat().st_size if part_path.exists() else 0
+    return session
+
+async def save_upload_session(session: UploadSession):
+    meta_path, _ = upload_session_paths(session.upload_id)
+    async with aiofiles.open(meta_path, 'w') as f:
+        await f.write(session.json())
+
+def remove_upload_session(upload_id: str):
+    for path in upload_session_paths(upload_id):
+        path.unlink(missing_ok=True)
+    upload_session_locks.pop(upload_id, None)
+
+@api_router.post("/admin/media/uploads", response_model=UploadSession)
+async def create_upload_session(
+    input: UploadSessionCreate,
+    current_admin: str = Depends(get_current_admin)
+):
+    resolve_media_type(input.content_type)
+    if input.total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive")
+    if input.total_size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"File exceeds maximum upload size of {MAX_UPLOAD_SIZE} bytes")
+    
+    session = UploadSession(**input.dict())
+    _, part_path = upload_session_paths(session.upload_id)
+    part_path.touch()
+    await save_upload_session(session)
+    return session
+
+@api_router.get("/admin/media/uploads/{upload_id}", response_model=UploadSession)
+async def get_upload_session(upload_id: str, current_admin: str = Depends(get_current_admin)):
+    return await load_upload_session(upload_id)
+
+@api_router.put("/admin/media/uploads/{upload_id}", response_model=UploadSession)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_admin: str = Depends(get_current_admin)
+):
+    """Append one chunk (the raw request body) at the given offset"""
+    lock = upload_session_locks.setdefault(upload_id, asyncio.Lock())
+    async with lock:
+        session = await load_upload_session(upload_id)
+        if offset != session.offset:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Offset does not match bytes received", "offset": session.offset}
+            )
+        
+        _, part_path = upload_session_paths(upload_id)
+        received = session.offset
+        async with aiofiles.open(part_path, 'ab') as f:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > session.total_size:
+                    # Discard this request's bytes so the stored offset stays consistent
+                    await f.truncate(session.offset)
+                    raise HTTPException(status_code=400, detail="Chunk exceeds declared total_size")
+                await f.write(chunk)
+        
+        session.offset = received
+        session.updated_at = datetime.utcnow()
+        await save_upload_session(session)
+        return session
+
+@api_router.post("/admin/media/uploads/{upload_id}/complete", response_model=MediaFile)
+async def complete_upload_session(upload_id: str, current_admin: str = Depends(get_current_admin)):
+    lock = upload_session_locks.setdefault(upload_id, asyncio.Lock())
+    async with lock:
+        session = await load_upload_session(upload_id)
+        if session.offset != session.total_size:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Upload is incomplete", "offset": session.offset}
+            )
+        
+        # Chunks arrive in separate requests, so hash the assembled file off the event loop
+        _, part_path = upload_session_paths(upload_id)
+        sha256 = await asyncio.to_thread(hash_file, part_path)
+        blob = await store_media_blob(part_path, sha256, session.total_size, session.content_type, session.filename)
+        media_file = await create_media_record(
+            blob, session.filename, session.content_type, session.category, session.description
+        )
+        
+        remove_upload_session(upload_id)
+        return media_file
+
+@api_router.delete("/admin/media/uploads/{upload_id}")
+async def abort_upload_session(upload_id: str, current_admin: str = Depends(get_current_admin)):
+    await load_upload_session(upload_id)
+    remove_upload_session(upload_id)
+    return {"message": "Upload session aborted"}
+
+def remove_stale_upload_sessions() -> int:
+    """Delete session files that have not been touched within UPLOAD_SESSION_TTL_HOURS"""
+    cutoff = time.time() - UPLOAD_SESSION_TTL_HOURS * 3600
+    removed = 0
+    for meta_path in UPLOAD_SESSION_DIR.glob("*.json"):
+        part_path = meta_path.with_suffix(".part")
+        try:
+            last_activity = max(
+                meta_path.stat().st_mtime,
+                part_path.stat().st_mtime if part_path.exists() else 0
+            )
+        except FileNotFoundError:
+            continue
+        if last_activity < cutoff:
+            remove_upload_session(meta_path.stem)
+            removed += 1
+    # .part files whose metadata is gone can never be completed
+    for part_path in UPLOAD_SESSION_DIR.glob("*.part"):
+        if not part_path.with_suffix(".json").exists() and part_path.stat().st_mtime < cutoff:
+            part_path.unlink(missing_ok=True)
+    # Leftovers from uploads and media processing interrupted by a crash
+    for temp_path in UPLOAD_TMP_DIR.iterdir():
+        if temp_path.stat().st_mtime < cutoff:
+            if temp_path.is_dir():
+                shutil.rmtree(temp_path, ignore_errors=True)
+            else:
+                temp_path.unlink(missing_ok=True)
+    return removed
+
+async def upload_session_gc_loop():
+    while True:
+        try:
+            removed = await asyncio.to_thread(remove_stale_upload_sessions)
+            if removed:
+                logger.info("Removed %d stale upload sessions", removed)
+        except Exception:
+            logger.exception("Upload session cleanup failed")
+        await asyncio.sleep(UPLOAD_SESSION_GC_INTERVAL)
+
 # Portfolio data endpoints
 @api_router.get("/")
 async def root():
@@ -798,26 +2164,1189 @@ async def get_projects(lang: str = "en"):
         ]
     }
 
+# Blog full-text search
+SEARCH_FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "excerpt": 1.5, "content": 1.0}
+SEARCH_BM25_K1 = 1.2
+SEARCH_BM25_B = 0.75
+SEARCH_MAX_PREFIX_EXPANSIONS = 50
+SEARCH_SNIPPET_FIELDS = ("title", "excerpt", "content")
+CJK_RANGES = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+SEARCH_TOKEN_RE = re.compile(rf"[{CJK_RANGES}]+|[^\W{CJK_RANGES}]+")
+CJK_RE = re.compile(rf"[{CJK_RANGES}]")
+ARABIC_RE = re.compile(r"[\u0600-\u06ff]")
+ARABIC_DIACRITICS_RE = re.compile(r"[\u064b-\u0652\u0640]")
+ARABIC_NORMALIZATION = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ة": "ه", "ى": "ي"})
+ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+ARABIC_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+
+def stem_english(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith(("sses", "xes", "zes", "ches", "shes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ingly", "edly", "ing", "ed", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+    return word
+
+def stem_french(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith("aux") and len(word) > 5:
+        word = word[:-3] + "al"
+    elif word.endswith(("s", "x")):
+        word = word[:-1]
+    for suffix in ("issement", "ement", "ment", "euse", "eux", "ive", "if"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if word.endswith("er") and len(word) > 4:
+        word = word[:-2]
+    elif word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+def stem_spanish(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith("es") and len(word) > 4 and word[-3] not in "aeiou":
+        word = word[:-2]
+    elif word.endswith("s"):
+        word = word[:-1]
+    for suffix in ("mente", "idad", "cion"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if word[-1] in "aeo" and len(word) > 4:
+        word = word[:-1]
+    return word
+
+def stem_arabic(word: str) -> str:
+    for prefix in ARABIC_PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+            word = word[len(prefix):]
+            break
+    if word.startswith("و") and len(word) > 3:
+        word = word[1:]
+    for suffix in ARABIC_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            word = word[:-len(suffix)]
+    return word
+
+SEARCH_STEMMERS = {
+    "en": stem_english,
+    "fr": stem_french,
+    "es": stem_spanish,
+    "ar": stem_arabic,
+    "zh": lambda word: word,
+}
+
+def normalize_token(token: str) -> str:
+    token = token.casefold()
+    if token.isascii():
+        return token
+    if ARABIC_RE.search(token):
+        return ARABIC_DIACRITICS_RE.sub("", token).translate(ARABIC_NORMALIZATION)
+    return "".join(c for c in unicodedata.normalize("NFKD", token) if not unicodedata.combining(c))
+
+def analyze_text(text: str, language: str, stem: bool = True):
+    """Split text into (term, start, end) tuples, with offsets pointing into the original text.
+
+    Han runs are indexed as overlapping character bigrams; every other word is
+    normalized (case, accents, Arabic letter forms) and run through the light
+    stemmer for the post's language.
+    """
+    stemmer = SEARCH_STEMMERS.get(language, stem_english)
+    for match in SEARCH_TOKEN_RE.finditer(text or ""):
+        token, start = match.group(), match.start()
+        if CJK_RE.match(token):
+            if len(token) == 1:
+                yield token, start, start + 1
+            for i in range(len(token) - 1):
+                yield token[i:i + 2], start + i, start + i + 2
+            continue
+        term = normalize_token(token)
+        yield (stemmer(term) if stem else term), start, match.end()
+
+class BlogSearchIndex:
+    """In-process inverted index over published blog posts, ranked with BM25.
+
+    Postings are keyed by "<language>:<term>" so each post is matched with the
+    analyzer for its own language; queries are analyzed once per indexed
+    language and never interpreted as patterns. Every process holds its own
+    index; writes made elsewhere arrive through sync_blog_state().
+    """
+
+    def __init__(self):
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.vocabulary: List[str] = []
+        self.language_counts: Dict[str, int] = {}
+        self.total_length = 0.0
+
+    def add(self, post: dict):
+        post_id = post["id"]
+        self.remove(post_id)
+        language = post.get("language") or "en"
+        fields = {
+            "title": post.get("title", ""),
+            "tags": " ".join(post.get("tags") or []),
+            "excerpt": post.get("excerpt", ""),
+            "content": post.get("content", ""),
+        }
+        terms: Dict[str, float] = {}
+        positions: Dict[str, Dict[str, List[tuple]]] = {}
+        length = 0.0
+        for field, text in fields.items():
+            weight = SEARCH_FIELD_WEIGHTS[field]
+            field_positions = positions[field] = {}
+            for term, start, end in analyze_text(text, language):
+                key = f"{language}:{term}"
+                terms[key] = terms.get(key, 0.0) + weight
+                field_positions.setdefault(key, []).append((start, end))
+                length += weight
+        for key, tf in terms.items():
+            postings = self.postings.get(key)
+            if postings is None:
+                postings = self.postings[key] = {}
+                bisect.insort(self.vocabulary, key)
+            postings[post_id] = tf
+        self.docs[post_id] = {
+            "language": language,
+            "category": post.get("category"),
+            "tags": set(post.get("tags") or []),
+            "timestamp": post["created_at"].timestamp() if post.get("created_at") else 0.0,
+            "length": length,
+            "terms": list(terms),
+            "text": {field: fields[field] for field in SEARCH_SNIPPET_FIELDS},
+            "positions": positions,
+        }
+        self.language_counts[language] = self.language_counts.get(language, 0) + 1
+        self.total_length += length
+
+    def remove(self, post_id: str):
+        doc = self.docs.pop(post_id, None)
+        if doc is None:
+            return
+        for key in doc["terms"]:
+            postings = self.postings.get(key)
+            if postings is None:
+                continue
+            postings.pop(post_id, None)
+            if not postings:
+                del self.postings[key]
+                index = bisect.bisect_left(self.vocabulary, key)
+                if index < len(self.vocabulary) and self.vocabulary[index] == key:
+                    del self.vocabulary[index]
+        self.language_counts[doc["language"]] -= 1
+        if not self.language_counts[doc["language"]]:
+            del self.language_counts[doc["language"]]
+        self.total_length -= doc["length"]
+
+    def query_terms(self, query: str) -> Dict[str, float]:
+        """Map the query onto index keys for every indexed language, with a weight per key.
+
+        The trailing word is also matched as a prefix, so results keep up with
+        search-as-you-type before the word is complete.
+        """
+        keys: Dict[str, float] = {}
+        partial = query and not query[-1].isspace()
+        for language in self.language_counts:
+            analyzed = list(analyze_text(query, language))
+            for term, _, _ in analyzed:
+                keys[f"{language}:{term}"] = 1.0
+            if partial and analyzed and not CJK_RE.match(analyzed[-1][0]):
+                last = normalize_token(query[analyzed[-1][1]:analyzed[-1][2]])
+                prefix = f"{language}:{last}"
+                start = bisect.bisect_left(self.vocabulary, prefix)
+                for key in itertools.islice(self.vocabulary, start, start + SEARCH_MAX_PREFIX_EXPANSIONS):
+                    if not key.startswith(prefix):
+                        break
+                    keys.setdefault(key, 0.5)
+        return keys
+
+    def search(self, query: str, category: Optional[str] = None, tag: Optional[str] = None,
+               keys: Optional[Dict[str, float]] = None) -> List[tuple]:
+        """Return (post_id, score) pairs for matching posts, best first"""
+        if not self.docs:
+            return []
+        total = len(self.docs)
+        average_length = self.total_length / total or 1.0
+        scores: Dict[str, float] = {}
+        for key, boost in (keys if keys is not None else self.query_terms(query)).items():
+            postings = self.postings.get(key)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for post_id, tf in postings.items():
+                doc = self.docs[post_id]
+                if category and doc["category"] != category:
+                    continue
+                if tag and tag not in doc["tags"]:
+                    continue
+                norm = SEARCH_BM25_K1 * (1 - SEARCH_BM25_B + SEARCH_BM25_B * doc["length"] / average_length)
+                scores[post_id] = scores.get(post_id, 0.0) + boost * idf * tf * (SEARCH_BM25_K1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], -self.docs[item[0]]["timestamp"]))
+
+    def highlights(self, post_id: str, field: str, keys) -> List[tuple]:
+        """Return the sorted (start, end) offsets in a field matched by any of keys"""
+        field_positions = self.docs[post_id]["positions"].get(field, {})
+        return sorted(span for key in keys for span in field_positions.get(key, ()))
+
+    def snippets(self, post_id: str, keys, count: int, window: int) -> List[Dict[str, Any]]:
+        """Pick up to count non-overlapping windows of the excerpt and content holding the most matches.
+
+        Windows are snapped to word boundaries, and highlight offsets are
+        relative to the snippet text.
+        """
+        candidates = []
+        for field in ("excerpt", "content"):
+            text = self.docs[post_id]["text"][field]
+            spans = self.highlights(post_id, field, keys)
+            for i, (first, _) in enumerate(spans):
+                start = max(0, first - window // 4)
+                if start:
+                    boundary = text.rfind(" ", 0, start)
+                    start = boundary + 1 if boundary >= first - window // 2 else start
+                end = min(len(text), start + window)
+                if end < len(text):
+                    boundary = text.rfind(" ", start, end)
+                    end = boundary if boundary > first else end
+                inside = [span for span in spans[i:] if span[1] <= end]
+                candidates.append((len(inside), -i, field, start, end, inside))
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[2] != "excerpt", -candidate[1]))
+        chosen = []
+        for matches, _, field, start, end, inside in candidates:
+            if len(chosen) >= count:
+                break
+            if any(field == other[0] and start < other[2] and other[1] < end for other in chosen):
+                continue
+            chosen.append((field, start, end, inside))
+        chosen.sort(key=lambda snippet: (snippet[0] != "excerpt", snippet[1]))
+        return [
+            {
+                "field": field,
+                "offset": start,
+                "text": self.docs[post_id]["text"][field][start:end],
+                "highlights": [[span_start - start, span_end - start] for span_start, span_end in inside],
+            }
+            for field, start, end, inside in chosen
+        ]
+
+blog_search_index = BlogSearchIndex()
+
+SEARCH_INDEX_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "content": 1, "excerpt": 1,
+    "tags": 1, "category": 1, "created_at": 1, "language": 1,
+}
+
+def build_blog_search_index(posts: List[dict]) -> BlogSearchIndex:
+    index = BlogSearchIndex()
+    for post in posts:
+        index.add(post)
+    return index
+
+async def load_blog_search_index():
+    """Rebuild the search index from every published post and swap it in"""
+    global blog_search_index
+    posts = await db.blog_posts.find({"published": True}, SEARCH_INDEX_PROJECTION).to_list(None)
+    blog_search_index = await asyncio.to_thread(build_blog_search_index, posts)
+    logger.info(f"Blog search index built with {len(posts)} posts")
+
+# Blog facets
+# Tag and category counts come from one aggregation and are cached until the next blog write.
+# The generation guards against storing a result that was computed before an invalidation.
+blog_facets_cache = {"generation": 0, "value": None, "expires": 0.0}
+
+BLOG_FACETS_PIPELINE = [
+    {"$match": {"published": True}},
+    {"$facet": {
+        "categories": [
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ],
+        "tags": [
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ],
+    }},
+]
+
+async def get_blog_facets() -> BlogFacets:
+    if blog_facets_cache["value"] is not None and blog_facets_cache["expires"] > time.monotonic():
+        return blog_facets_cache["value"]
+    generation = blog_facets_cache["generation"]
+    result = (await db.blog_posts.aggregate(BLOG_FACETS_PIPELINE).to_list(1))[0]
+    facets = BlogFacets(**{
+        name: [FacetCount(value=bucket["_id"], count=bucket["count"]) for bucket in result[name] if bucket["_id"] is not None]
+        for name in ("categories", "tags")
+    })
+    if blog_facets_cache["generation"] == generation:
+        blog_facets_cache.update(value=facets, expires=time.monotonic() + BLOG_FACETS_TTL)
+    return facets
+
+def invalidate_blog_facets():
+    blog_facets_cache.update(generation=blog_facets_cache["generation"] + 1, value=None)
+
+# Public response cache
+class ResponseCache:
+    """In-process TTL + LRU cache of encoded JSON responses, bounded by total bytes.
+
+    Keys are built from the endpoint name and its parsed parameters, so equivalent
+    query strings share an entry. invalidate() bumps the generation and drops every
+    entry; a response that was loading across an invalidation is served but not stored.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.size = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict) -> str:
+        normalized = sorted((name, value) for name, value in params.items() if value is not None)
+        return json.dumps([endpoint, normalized], default=str, separators=(",", ":"))
+
+    def get(self, key: str) -> Optional[tuple]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            self.discard(key)
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, generation: int, body: bytes, headers: Dict[str, str]) -> tuple:
+        entry_size = len(key) + len(body) + sum(len(k) + len(v) for k, v in headers.items())
+        entry = (body, headers, time.monotonic() + self.ttl, entry_size)
+        # Entries written before an invalidation, or too big to be worth evicting others for, are not kept
+        if generation != self.generation or entry_size > self.max_bytes // 4:
+            return entry
+        self.discard(key)
+        self.entries[key] = entry
+        self.size += entry_size
+        while self.size > self.max_bytes:
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+        return entry
+
+    def discard(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[3]
+
+    def invalidate(self):
+        self.generation += 1
+        self.entries.clear()
+        self.size = 0
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    async def load_entry(self, key: str, generation: int, load) -> tuple:
+        content, headers = await load()
+        body = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        return self.put(key, generation, body, headers)
+
+    async def respond(self, endpoint: str, params: dict, load, request: Optional[Request] = None) -> Response:
+        """Serve a cached response, or await load() -> (content, headers) and cache its JSON encoding.
+
+        Concurrent misses for the same key and generation share a single load. When the
+        response carries validators and request's conditional headers match, a 304 is sent.
+        """
+        key = self.make_key(endpoint, params)
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            status = "HIT"
+        else:
+            self.misses += 1
+            status = "MISS"
+            generation = self.generation
+            entry = await read_flights.do(f"{generation}:{key}", lambda: self.load_entry(key, generation, load))
+        if request is not None and is_not_modified(request, entry[1]):
+            headers = {name: value for name, value in entry[1].items() if name in VALIDATOR_HEADERS}
+            return Response(status_code=304, headers={**headers, "X-Cache": status})
+        return Response(content=entry[0], media_type="application/json", headers={**entry[1], "X-Cache": status})
+
+# Conditional GET for blog responses
+VALIDATOR_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+def blog_validators(posts: list) -> Dict[str, str]:
+    """Strong ETag and Last-Modified for a post or a page of posts.
+
+    The ETag hashes each post's id and updated_at (plus the featured image as
+    served, which depends on the requested variant, and the renderer version of
+    full posts); Last-Modified is the newest updated_at.
+    """
+    digest = hashlib.sha256()
+    for post in posts:
+        renderer_version = getattr(post, "content_renderer_version", None)
+        digest.update(f"{post.id}|{post.updated_at.isoformat()}|{post.featured_image or ''}|{renderer_version}\n".encode())
+    headers = {"ETag": f'"{digest.hexdigest()[:32]}"', "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    latest = max((post.updated_at for post in posts), default=None)
+    if latest is not None:
+        headers["Last-Modified"] = formatdate(latest.replace(tzinfo=timezone.utc).timestamp(), usegmt=True)
+    return headers
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return "ETag" in headers and etag_matches(if_none_match, headers["ETag"])
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        return not_modified_since(if_modified_since, parsedate_to_datetime(headers["Last-Modified"]).timestamp())
+    return False
+
+blog_response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL)
+
+# Blog feeds
+# Only the newest FEED_MAX_ENTRIES published posts are kept, each as a pre-rendered Atom
+# <entry> and JSON Feed item in created_at order. A write re-renders only the fragment it
+# touches and the feed documents are re-assembled by joining the fragments; reads serve the
+# assembled bytes. When a listed post leaves, the window is topped up from the database.
+FEED_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "excerpt": 1, "author": 1, "tags": 1, "category": 1,
+    "created_at": 1, "updated_at": 1, "featured_image": 1, "language": 1,
+}
+
+def rfc3339(value: datetime) -> str:
+    return value.replace(microsecond=0).isoformat() + "Z"
+
+def absolute_url(path: str) -> str:
+    return path if urlsplit(path).scheme else f"{SITE_URL}/{path.lstrip('/')}"
+
+def render_atom_entry(post: dict) -> bytes:
+    url = f"{SITE_URL}/blog/{post['id']}"
+    categories = "".join(f'<category term={quoteattr(tag)}/>' for tag in post.get("tags") or [])
+    return (
+        f'<entry xml:lang={quoteattr(post.get("language") or "en")}>'
+        f'<id>urn:uuid:{post["id"]}</id>'
+        f'<title>{xml_escape(post["title"])}</title>'
+        f'<link rel="alternate" type="text/html" href={quoteattr(url)}/>'
+        f'<published>{rfc3339(post["created_at"])}</published>'
+        f'<updated>{rfc3339(post["updated_at"])}</updated>'
+        f'<author><name>{xml_escape(post.get("author") or "")}</name></author>'
+        f'{categories}'
+        f'<summary>{xml_escape(post.get("excerpt") or "")}</summary>'
+        f'</entry>'
+    ).encode("utf-8")
+
+def render_json_feed_item(post: dict) -> bytes:
+    item = {
+        "id": post["id"],
+        "url": f"{SITE_URL}/blog/{post['id']}",
+        "title": post["title"],
+        "summary": post.get("excerpt") or "",
+        "date_published": rfc3339(post["created_at"]),
+        "date_modified": rfc3339(post["updated_at"]),
+        "authors": [{"name": post.get("author") or ""}],
+        "tags": post.get("tags") or [],
+        "language": post.get("language") or "en",
+    }
+    if post.get("featured_image"):
+        item["image"] = absolute_url(post["featured_image"])
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class BlogFeed:
+    """Atom and JSON Feed documents for the newest published posts, maintained incrementally"""
+
+    def __init__(self):
+        self.entries: Dict[str, tuple] = {}  # post id -> (created_at, updated_at, atom entry, json item)
+        self.order: List[tuple] = []  # (created_at, id) of every entry, oldest first
+        self.documents: Dict[str, tuple] = {}  # format -> (body, headers)
+        self.version = 0
+        self.render()
+
+    def upsert(self, post: dict) -> bool:
+        """Add or replace a post's fragments; False when it is older than a full feed"""
+        self.discard(post["id"])
+        key = (post["created_at"], post["id"])
+        if len(self.order) >= FEED_MAX_ENTRIES and key < self.order[0]:
+            return False
+        bisect.insort(self.order, key)
+        self.entries[post["id"]] = (
+            post["created_at"], post["updated_at"], render_atom_entry(post), render_json_feed_item(post)
+        )
+        if len(self.order) > FEED_MAX_ENTRIES:
+            _, oldest = self.order.pop(0)
+            del self.entries[oldest]
+        return True
+
+    def discard(self, post_id: str) -> bool:
+        entry = self.entries.pop(post_id, None)
+        if entry is None:
+            return False
+        self.order.remove((entry[0], post_id))
+        return True
+
+    async def fill(self):
+        """Top the window up to FEED_MAX_ENTRIES with the newest published posts"""
+        while True:
+            version = self.version
+            posts = await db.blog_posts.find({"published": True}, FEED_SUMMARY_PROJECTION).sort(
+                [("created_at", -1), ("id", -1)]
+            ).to_list(FEED_MAX_ENTRIES)
+            # A write that landed during the query may have made these posts stale
+            if version == self.version:
+                break
+        for post in posts:
+            if post["id"] not in self.entries:
+                self.upsert(post)
+
+    async def update(self, post_id: str, post: Optional[dict]):
+        """Apply a blog write; the documents are only re-assembled when a listed post was touched"""
+        self.version += 1
+        if post and post.get("published"):
+            if not self.upsert(post):
+                return
+        elif not self.discard(post_id):
+            return
+        elif len(self.order) == FEED_MAX_ENTRIES - 1:
+            await self.fill()
+        self.render()
+
+    def render(self):
+        newest = [self.entries[post_id] for _, post_id in reversed(self.order)]
+        updated = max((entry[1] for entry in newest), default=datetime(1970, 1, 1))
+        atom = b"".join([
+            b'<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">',
+            f'<id>{xml_escape(SITE_URL)}/blog</id>'
+            f'<title>{xml_escape(FEED_TITLE)}</title>'
+            f'<updated>{rfc3339(updated)}</updated>'
+            f'<link rel="alternate" type="text/html" href={quoteattr(SITE_URL + "/blog")}/>'
+            f'<link rel="self" type="application/atom+xml" href={quoteattr(SITE_URL + "/api/blog/feed.xml")}/>'.encode("utf-8"),
+            *[entry[2] for entry in newest],
+            b"</feed>",
+        ])
+        header = json.dumps({
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": FEED_TITLE,
+            "home_page_url": f"{SITE_URL}/blog",
+            "feed_url": f"{SITE_URL}/api/blog/feed.json",
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        json_feed = header[:-1] + b',"items":[' + b",".join(entry[3] for entry in newest) + b"]}"
+        last_modified = formatdate(updated.replace(tzinfo=timezone.utc).timestamp(), usegmt=True)
+        for name, body, media_type in (
+            ("atom", atom, "application/atom+xml"),
+            ("json", json_feed, "application/feed+json"),
+        ):
+            self.documents[name] = (body, {
+                "Content-Type": media_type,
+                "ETag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+                "Last-Modified": last_modified,
+                "Cache-Control": REVALIDATE_CACHE_CONTROL,
+            })
+
+    def respond(self, name: str, request: Request) -> Response:
+        body, headers = self.documents[name]
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers={k: v for k, v in headers.items() if k in VALIDATOR_HEADERS})
+        return Response(content=body, headers=headers, media_type=headers["Content-Type"])
+
+blog_feed = BlogFeed()
+
+async def load_blog_feed():
+    """Render feed fragments for the newest published posts"""
+    global blog_feed
+    feed = BlogFeed()
+    await feed.fill()
+    feed.render()
+    blog_feed = feed
+
+# Related posts
+# Posts are hashed bag-of-words TF-IDF vectors (title counted twice) in a sparse matrix;
+# relatedness blends cosine similarity with tag Jaccard overlap. Each post's top-k
+# neighbours are kept in memory. A write rescores only the touched post against the
+# matrix and patches the neighbour lists it enters or leaves; IDF weights drift as the
+# corpus changes, so everything is recomputed in the background every few writes.
+# Writes are applied in order on one worker thread, so the O(n) matrix work never runs
+# on the event loop and never overlaps another write.
+def related_term_counts(post: dict) -> Dict[int, float]:
+    language = post.get("language") or "en"
+    counts: Dict[int, float] = {}
+    text = " ".join([post.get("title") or ""] * 2 + [post.get("excerpt") or "", post.get("content") or ""])
+    for term, _, _ in analyze_text(text, language):
+        if len(term) < 3 and not CJK_RE.match(term):
+            continue
+        feature = zlib.crc32(f"{language}:{term}".encode("utf-8")) % RELATED_HASH_FEATURES
+        counts[feature] = counts.get(feature, 0.0) + 1.0
+    return counts
+
+def tfidf_matrix(counts: List[Dict[int, float]], df: np.ndarray) -> sp.csr_matrix:
+    """L2-normalized TF-IDF rows with sublinear term frequency"""
+    idf = np.log((len(counts) + 1) / (df + 1.0)) + 1.0
+    indptr, indices, data = [0], [], []
+    for row in counts:
+        features = np.fromiter(row.keys(), dtype=np.int64, count=len(row))
+        weights = (1.0 + np.log(np.fromiter(row.values(), dtype=np.float64, count=len(row)))) * idf[features]
+        norm = np.linalg.norm(weights)
+        indices.append(features)
+        data.append(weights / norm if norm else weights)
+        indptr.append(indptr[-1] + len(row))
+    return sp.csr_matrix(
+        (np.concatenate(data) if data else np.zeros(0), np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64), indptr),
+        shape=(len(counts), RELATED_HASH_FEATURES),
+    )
+
+def tag_matrix(tag_sets: List[frozenset], vocabulary: Dict[str, int]) -> sp.csr_matrix:
+    rows, cols = [], []
+    for row, tags in enumerate(tag_sets):
+        for tag in tags:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(tag, len(vocabulary)))
+    return sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(tag_sets), max(len(vocabulary), 1)))
+
+def related_scores(vectors: sp.csr_matrix, tags: sp.csr_matrix, matrix: sp.csr_matrix, all_tags: sp.csr_matrix) -> np.ndarray:
+    """Blended relatedness of each row in vectors/tags against every row of matrix/all_tags"""
+    cosine = (vectors @ matrix.T).toarray()
+    shared = (tags @ all_tags.T).toarray()
+    sizes = np.asarray(all_tags.sum(axis=1)).ravel()
+    union = np.asarray(tags.sum(axis=1)).reshape(-1, 1) + sizes - shared
+    jaccard = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+    return (1 - RELATED_TAG_WEIGHT) * cosine + RELATED_TAG_WEIGHT * jaccard
+
+def top_neighbors(ids: List[str], scores: np.ndarray, exclude: int) -> List[tuple]:
+    scores = scores.copy()
+    scores[exclude] = 0.0
+    k = min(RELATED_TOP_K, len(ids) - 1)
+    if k <= 0:
+        return []
+    best = np.argpartition(-scores, k - 1)[:k]
+    return [(ids[i], float(scores[i])) for i in sorted(best, key=lambda i: -scores[i]) if scores[i] > 0]
+
+class RelatedPostsIndex:
+    """Top-k related published posts per post, kept current on blog writes"""
+
+    def __init__(self, counts: Optional[Dict[str, Dict[int, float]]] = None, tag_sets: Optional[Dict[str, frozenset]] = None):
+        self.counts = counts or {}
+        self.tag_sets = tag_sets or {}
+        self.df = np.zeros(RELATED_HASH_FEATURES, dtype=np.float64)
+        for row in self.counts.values():
+            self.df[list(row)] += 1
+        self.version = 0
+        self.writes_since_rebuild = 0
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute every vector with current IDF weights and every neighbour list"""
+        self.ids = list(self.counts)
+        self.rows = {post_id: row for row, post_id in enumerate(self.ids)}
+        self.matrix = tfidf_matrix([self.counts[post_id] for post_id in self.ids], self.df)
+        self.tag_vocabulary: Dict[str, int] = {}
+        self.tags = tag_matrix([self.tag_sets[post_id] for post_id in self.ids], self.tag_vocabulary)
+        self.neighbors: Dict[str, List[tuple]] = {}
+        for start in range(0, len(self.ids), 256):
+            block = related_scores(self.matrix[start:start + 256], self.tags[start:start + 256], self.matrix, self.tags)
+            for offset, scores in enumerate(block):
+                self.neighbors[self.ids[start + offset]] = top_neighbors(self.ids, scores, start + offset)
+        self.writes_since_rebuild = 0
+
+    def snapshot(self):
+        return dict(self.counts), dict(self.tag_sets), self.version
+
+    def rescore(self, post_ids) -> None:
+        rows = [self.rows[post_id] for post_id in post_ids]
+        if not rows:
+            return
+        for post_id, scores in zip(post_ids, related_scores(self.matrix[rows], self.tags[rows], self.matrix, self.tags)):
+            self.neighbors[post_id] = top_neighbors(self.ids, scores, self.rows[post_id])
+
+    def restack(self, changed: Optional[str] = None):
+        """Re-assemble the matrices after a row was added, replaced or dropped"""
+        counts = [self.counts[post_id] for post_id in self.ids]
+        if changed is None or changed not in self.rows or self.matrix.shape[0] != len(self.ids):
+            self.matrix = tfidf_matrix(counts, self.df)
+        else:
+            # Other rows keep the IDF weights they were computed with until the next rebuild
+            row = self.rows[changed]
+            vector = tfidf_matrix([self.counts[changed]], self.df)
+            self.matrix = sp.vstack([self.matrix[:row], vector, self.matrix[row + 1:]], format="csr")
+        self.tags = tag_matrix([self.tag_sets[post_id] for post_id in self.ids], self.tag_vocabulary)
+
+    def upsert(self, post: dict):
+        post_id = post["id"]
+        self.discard_counts(post_id)
+        self.counts[post_id] = related_term_counts(post)
+        self.tag_sets[post_id] = frozenset(post.get("tags") or [])
+        self.df[list(self.counts[post_id])] += 1
+        if post_id not in self.rows:
+            self.rows[post_id] = len(self.ids)
+            self.ids.append(post_id)
+        self.restack(post_id)
+        row = self.rows[post_id]
+        scores = related_scores(self.matrix[row], self.tags[row], self.matrix, self.tags)[0]
+        self.neighbors[post_id] = top_neighbors(self.ids, scores, row)
+        # Patch the lists of every other post: drop the stale entry, insert the new score where it ranks
+        refill = []
+        for other, other_row in self.rows.items():
+            if other == post_id:
+                continue
+            current = self.neighbors.get(other, [])
+            previous = next((score for neighbor, score in current if neighbor == post_id), None)
+            score = float(scores[other_row])
+            if previous is not None and score < previous:
+                # A post outside the list may now outrank it
+                refill.append(other)
+                continue
+            if score > 0:
+                entries = [entry for entry in current if entry[0] != post_id] + [(post_id, score)]
+                entries.sort(key=lambda entry: -entry[1])
+                self.neighbors[other] = entries[:RELATED_TOP_K]
+        self.rescore(refill)
+        self.wrote()
+
+    def remove(self, post_id: str):
+        if post_id not in self.rows:
+            return
+        self.discard_counts(post_id)
+        del self.counts[post_id]
+        del self.tag_sets[post_id]
+        self.neighbors.pop(post_id, None)
+        self.ids.remove(post_id)
+        self.rows = {other: row for row, other in enumerate(self.ids)}
+        self.restack()
+        self.rescore([other for other, entries in self.neighbors.items() if any(entry[0] == post_id for entry in entries)])
+        self.wrote()
+
+    def discard_counts(self, post_id: str):
+        if post_id in self.counts:
+            self.df[list(self.counts[post_id])] -= 1
+
+    def wrote(self):
+        self.version += 1
+        self.writes_since_rebuild += 1
+
+related_posts_index = RelatedPostsIndex()
+related_posts_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="related-posts")
+related_rebuild_task: Optional[asyncio.Task] = None
+
+def build_related_posts_index(counts: Dict[str, Dict[int, float]], tag_sets: Dict[str, frozenset]) -> RelatedPostsIndex:
+    return RelatedPostsIndex(counts, tag_sets)
+
+async def load_related_posts_index():
+    """Vectorize every published post and compute all neighbour lists"""
+    global related_posts_index
+    counts, tag_sets = {}, {}
+    async for post in db.blog_posts.find({"published": True}, SEARCH_INDEX_PROJECTION):
+        counts[post["id"]] = await asyncio.to_thread(related_term_counts, post)
+        tag_sets[post["id"]] = frozenset(post.get("tags") or [])
+    related_posts_index = await asyncio.to_thread(build_related_posts_index, counts, tag_sets)
+
+async def run_related_posts_write(fn):
+    """Run fn on the write thread; it looks the index up when it runs, so it never lands on a replaced one"""
+    return await asyncio.get_running_loop().run_in_executor(related_posts_executor, fn)
+
+def install_related_posts_index(index: RelatedPostsIndex, version: int) -> bool:
+    global related_posts_index
+    if related_posts_index.version != version:
+        return False
+    related_posts_index = index
+    return True
+
+async def refresh_related_posts_index():
+    """Rebuild from the in-memory counts in a thread; the result is dropped if a write landed meanwhile"""
+    counts, tag_sets, version = await run_related_posts_write(lambda: related_posts_index.snapshot())
+    rebuilt = await asyncio.to_thread(build_related_posts_index, counts, tag_sets)
+    if await run_related_posts_write(lambda: install_related_posts_index(rebuilt, version)):
+        blog_response_cache.invalidate()
+
+def start_related_posts_refresh():
+    """Start a rebuild unless one is already running"""
+    global related_rebuild_task
+    if related_rebuild_task is not None and not related_rebuild_task.done():
+        return
+    related_rebuild_task = asyncio.create_task(refresh_related_posts_index())
+    related_rebuild_task.add_done_callback(related_posts_refresh_done)
+
+def related_posts_refresh_done(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        logger.error("Related posts rebuild failed", exc_info=task.exception())
+
+async def load_blog_state():
+    """Rebuild every in-process structure derived from blog posts"""
+    global blog_state_generation
+    state = await db.app_state.find_one({"_id": "blog"})
+    generation = state["generation"] if state else 0
+    await load_blog_search_index()
+    await load_blog_feed()
+    await load_related_posts_index()
+    await load_publish_queue()
+    publish_wakeup.set()
+    invalidate_blog_facets()
+    blog_response_cache.invalidate()
+    blog_state_generation = generation
+
+async def blog_post_changed(post_id: str, post: Optional[dict]):
+    """Bring derived blog state in line after a write; post is None once it is deleted"""
+    if post and post.get("published"):
+        blog_search_index.add(post)
+    else:
+        blog_search_index.remove(post_id)
+    invalidate_blog_facets()
+    await blog_feed.update(post_id, post)
+    if not (post and post.get("published")):
+        popularity_ranking.remove(post_id)
+    if post and post.get("published"):
+        await run_related_posts_write(lambda: related_posts_index.upsert(post))
+    else:
+        await run_related_posts_write(lambda: related_posts_index.remove(post_id))
+    if related_posts_index.writes_since_rebuild >= RELATED_REBUILD_AFTER_WRITES:
+        start_related_posts_refresh()
+    blog_response_cache.invalidate()
+    await announce_blog_change()
+
+# Cross-process blog state
+# Each process keeps its own search index, feeds and related posts. Every blog write bumps a
+# shared generation in db.app_state; a process that finds the generation moved on without it
+# rebuilds its state from the database, so other workers see a write within BLOG_STATE_SYNC_INTERVAL.
+blog_state_generation = 0
+
+async def announce_blog_change():
+    global blog_state_generation
+    state = await db.app_state.find_one_and_update(
+        {"_id": "blog"}, {"$inc": {"generation": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    # Only a process that had seen every earlier write is still in sync
+    if state["generation"] == blog_state_generation + 1:
+        blog_state_generation = state["generation"]
+
+async def sync_blog_state():
+    state = await db.app_state.find_one({"_id": "blog"})
+    if (state["generation"] if state else 0) != blog_state_generation:
+        await load_blog_state()
+
+async def blog_state_sync_loop():
+    while True:
+        await asyncio.sleep(BLOG_STATE_SYNC_INTERVAL)
+        try:
+            await sync_blog_state()
+        except Exception:
+            logger.exception("Failed to sync blog state")
+
+# View counting
+# Views are counted in memory and written behind in one unordered bulk_write of $inc
+# operations every VIEW_FLUSH_INTERVAL seconds, so reads never wait on a write. The
+# counts stay out of the post models: a flush does not touch updated_at, so serving them
+# would change response bodies under an unchanged ETag.
+class PopularityRanking:
+    """Exponentially decayed view scores, kept with forward decay.
+
+    A view at time t adds exp(rate * (t - landmark)), so older views never need
+    touching; dividing by the weight of "now" gives the decayed score.
+    """
+
+    def __init__(self, half_life_hours: float):
+        self.rate = math.log(2) / (half_life_hours * 3600)
+        self.landmark = time.time()
+        self.scores: Dict[str, float] = {}
+
+    def weight(self, at: float) -> float:
+        return math.exp(self.rate * (at - self.landmark))
+
+    def add(self, post_id: str, views: float, at: Optional[float] = None):
+        at = time.time() if at is None else at
+        weight = self.weight(at)
+        self.scores[post_id] = self.scores.get(post_id, 0.0) + views * weight
+        if weight > 1e100:
+            # Move the landmark forward before the weights overflow
+            self.scores = {key: score / weight for key, score in self.scores.items()}
+            self.landmark = at
+
+    def current(self, post_id: str, at: Optional[float] = None) -> float:
+        return self.scores.get(post_id, 0.0) / self.weight(time.time() if at is None else at)
+
+    def remove(self, post_id: str):
+        self.scores.pop(post_id, None)
+
+    def top(self, count: int) -> List[tuple]:
+        return heapq.nlargest(count, self.scores.items(), key=lambda item: item[1])
+
+pending_views: Dict[str, int] = {}
+popularity_ranking = PopularityRanking(POPULAR_HALF_LIFE_HOURS)
+
+def record_view(post_id: str):
+    pending_views[post_id] = pending_views.get(post_id, 0) + 1
+    popularity_ranking.add(post_id, 1)
+
+async def flush_view_counts():
+    """Write the pending view increments, with each post's decayed popularity as of now"""
+    global pending_views
+    if not pending_views:
+        return
+    batch, pending_views = list(pending_views.items()), {}
+    now, flushed_at = time.time(), datetime.utcnow()
+    operations = [
+        UpdateOne({"id": post_id}, {
+            "$inc": {"view_count": views},
+            "$set": {"popularity": popularity_ranking.current(post_id, now), "popularity_at": flushed_at},
+        })
+        for post_id, views in batch
+    ]
+    try:
+        await db.blog_posts.bulk_write(operations, ordered=False)
+    except BulkWriteError as error:
+        # The write is unordered, so every operation without a write error has been applied
+        failed = [batch[write_error["index"]] for write_error in error.details.get("writeErrors", [])]
+        logger.error(f"Failed to flush view counts for {len(failed)} posts; keeping them for the next flush")
+        requeue_views(failed)
+    except Exception:
+        logger.exception("Failed to flush view counts; keeping them for the next flush")
+        requeue_views(batch)
+
+def requeue_views(counts: List[tuple]):
+    for post_id, views in counts:
+        pending_views[post_id] = pending_views.get(post_id, 0) + views
+
+async def view_flush_loop():
+    while True:
+        await asyncio.sleep(VIEW_FLUSH_INTERVAL)
+        await flush_view_counts()
+
+async def load_popularity_ranking():
+    """Restore decayed popularity from the scores saved with the last flushes"""
+    async for post in db.blog_posts.find(
+        {"published": True, "popularity": {"$gt": 0}}, {"_id": 0, "id": 1, "popularity": 1, "popularity_at": 1}
+    ):
+        popularity_ranking.add(
+            post["id"], post["popularity"], post["popularity_at"].replace(tzinfo=timezone.utc).timestamp()
+        )
+
+# Revision history
+# Revision n of a post is either a full snapshot (every REVISION_SNAPSHOT_INTERVAL-th revision,
+# starting with the first) or the line-level delta from revision n-1 plus the metadata fields
+# that changed. Reconstructing a version replays at most one interval of deltas. A revision
+# whose predecessor was never stored is kept whole, so one failed write does not break the chain.
+def line_delta(old: str, new: str) -> List[list]:
+    """[start, end, lines] edits replacing old lines [start:end] with lines, in order"""
+    old_lines, new_lines = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+    ]
+
+def apply_line_delta(old: str, delta: List[list]) -> str:
+    old_lines = old.splitlines(keepends=True)
+    lines, position = [], 0
+    for start, end, replacement in delta:
+        lines.extend(old_lines[position:start])
+        lines.extend(replacement)
+        position = end
+    lines.extend(old_lines[position:])
+    return "".join(lines)
+
+async def record_blog_revision(previous: Optional[dict], current: dict):
+    """Store current as the next revision; previous is the state it replaced"""
+    try:
+        await insert_blog_revision(previous, current)
+    except Exception:
+        # The post itself is already written; the next revision is stored whole to recover
+        logger.exception(f"Failed to record revision {current.get('revision', 1)} of blog post {current['id']}")
+
+async def insert_blog_revision(previous: Optional[dict], current: dict):
+    number = current.get("revision", 1)
+    revision = {
+        "id": str(uuid.uuid4()),
+        "post_id": current["id"],
+        "number": number,
+        "created_at": current.get("updated_at") or datetime.utcnow(),
+    }
+    changed = [
+        field for field in REVISION_FIELDS + ("content",)
+        if previous is None or current.get(field) != previous.get(field)
+    ]
+    if (
+        previous is None
+        or (number - 1) % REVISION_SNAPSHOT_INTERVAL == 0
+        or not await db.blog_revisions.find_one({"post_id": current["id"], "number": number - 1}, {"_id": 1})
+    ):
+        fields = {field: current.get(field) for field in REVISION_FIELDS}
+        revision.update(kind="snapshot", content=current["content"], size=len(current["content"].encode("utf-8")))
+    else:
+        fields = {field: current.get(field) for field in changed if field != "content"}
+        delta = await asyncio.to_thread(line_delta, previous["content"], current["content"])
+        revision.update(kind="delta", delta=delta, size=len(json.dumps(delta, ensure_ascii=False).encode("utf-8")))
+    revision.update(fields=fields, changed_fields=sorted(changed))
+    await db.blog_revisions.insert_one(revision)
+
+async def reconstruct_blog_revision(post_id: str, number: int) -> Optional[dict]:
+    """Rebuild revision number from the nearest snapshot at or before it"""
+    snapshot = await db.blog_revisions.find_one(
+        {"post_id": post_id, "kind": "snapshot", "number": {"$lte": number}}, sort=[("number", -1)]
+    )
+    if snapshot is None:
+        return None
+    content, fields, revision = snapshot["content"], dict(snapshot["fields"]), snapshot
+    async for delta in db.blog_revisions.find(
+        {"post_id": post_id, "number": {"$gt": snapshot["number"], "$lte": number}}
+    ).sort("number", 1):
+        if delta["number"] != revision["number"] + 1:
+            # Replaying past a missing delta would silently produce the wrong content
+            raise HTTPException(
+                status_code=409, detail=f"Revision {revision['number'] + 1} is missing; revision {number} cannot be rebuilt"
+            )
+        revision = delta
+        content = apply_line_delta(content, revision["delta"])
+        fields.update(revision["fields"])
+    if revision["number"] != number:
+        return None
+    return {**revision, "content": content, "fields": fields}
+
+# Scheduled publishing
+# Upcoming publish times sit in a min-heap and the scheduler sleeps until the earliest one,
+# or until a write schedules something sooner, instead of polling the database. publish_at is
+# cleared once a post goes live or is published or unpublished by hand, so every draft that
+# still has one is pending; a time that passed while no server was running fires on the next
+# load. Entries are never removed in place: a rescheduled, deleted or manually (un)published
+# post leaves a stale entry whose conditional update matches nothing when it fires.
+publish_queue: List[tuple] = []  # (fire_at, post_id, publish_at)
+publish_wakeup = asyncio.Event()
+
+def normalize_publish_at(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC at millisecond precision, so the value matches what Mongo stores"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+def schedule_publication(post_id: str, publish_at: datetime):
+    heapq.heappush(publish_queue, (publish_at, post_id, publish_at))
+    publish_wakeup.set()
+
+async def load_publish_queue():
+    publish_queue.clear()
+    async for post in db.blog_posts.find(
+        {"published": False, "publish_at": {"$ne": None}}, {"_id": 0, "id": 1, "publish_at": 1}
+    ):
+        heapq.heappush(publish_queue, (post["publish_at"], post["id"], post["publish_at"]))
+    # The rebuilt queue may hold something earlier than what the scheduler is sleeping on
+    publish_wakeup.set()
+
+async def publish_due_post(post_id: str, publish_at: datetime):
+    # Going live changes revisioned fields, so it is a revision like any edit
+    changes = {"published": True, "updated_at": datetime.utcnow()}
+    previous = await db.blog_posts.find_one_and_update(
+        {"id": post_id, "published": False, "publish_at": publish_at},
+        {"$set": changes, "$unset": {"publish_at": ""}, "$inc": {"revision": 1}},
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous:
+        post = {**previous, **changes, "revision": previous.get("revision", 0) + 1}
+        post.pop("publish_at")
+        # A post from before revision history starts its history here
+        await record_blog_revision(previous if "revision" in previous else None, post)
+        await blog_post_changed(post_id, post)
+        logger.info(f"Published scheduled blog post {post_id}")
+
+async def publish_scheduler_loop():
+    while True:
+        # Clear before looking so a post scheduled while we publish still wakes us
+        publish_wakeup.clear()
+        while publish_queue and publish_queue[0][0] <= datetime.utcnow():
+            _, post_id, publish_at = heapq.heappop(publish_queue)
+            try:
+                await publish_due_post(post_id, publish_at)
+            except Exception:
+                logger.exception(f"Scheduled publish of {post_id} failed; retrying in a minute")
+                heapq.heappush(publish_queue, (datetime.utcnow() + timedelta(minutes=1), post_id, publish_at))
+        timeout = (publish_queue[0][0] - datetime.utcnow()).total_seconds() if publish_queue else None
+        try:
+            await asyncio.wait_for(publish_wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
 # Blog endpoints with enhanced functionality
 @api_router.post("/admin/blog", response_model=BlogPost)
 async def create_blog_post(input: BlogPostCreate, current_admin: str = Depends(get_current_admin)):
+    if input.language not in LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported language: {input.language}")
+    
     blog_dict = input.dict()
     blog_obj = BlogPost(**blog_dict)
     
+    # A post with a future publish_at stays a draft until the scheduler publishes it
+    blog_obj.publish_at = normalize_publish_at(blog_obj.publish_at)
+    if blog_obj.publish_at and blog_obj.publish_at > datetime.utcnow():
+        blog_obj.published = False
+    else:
+        blog_obj.publish_at = None
+    
     # Calculate reading time
     blog_obj.reading_time = calculate_reading_time(blog_obj.content)
     
+    # Render once here so reads serve stored HTML
+    for field, value in (await render_blog_content(blog_obj.content)).items():
+        setattr(blog_obj, field, value)
+    
     await db.blog_posts.insert_one(blog_obj.dict())
+    await record_blog_revision(None, blog_obj.dict())
+    await blog_post_changed(blog_obj.id, blog_obj.dict())
+    if blog_obj.publish_at:
+        schedule_publication(blog_obj.id, blog_obj.publish_at)
     return blog_obj
 
-@api_router.get("/blog", response_model=List[BlogPost])
+@api_router.get("/blog", response_model=List[BlogPostSummary])
 async def get_blog_posts(
+    request: Request,
     category: Optional[str] = None,
     tag: Optional[str] = None,
     search: Optional[str] = None,
-    limit: int = Query(default=10, le=50),
-    skip: int = Query(default=0, ge=0)
+    limit: int = Query(default=10, ge=1, le=50),
+    skip: int = Query(default=0, ge=0),
+    cursor: Optional[str] = None,
+    image_variant: Optional[str] = None
 ):
+    params = dict(category=category, tag=tag, search=search, limit=limit, skip=skip, cursor=cursor, image_variant=image_variant)
+    return await blog_response_cache.respond("blog", params, lambda: load_blog_posts(**params), request)
+
+async def load_blog_posts(category, tag, search, limit, skip, cursor, image_variant):
+    if search and search.strip():
+        # Rank with the in-process index, then load just the requested page
+        ranked = blog_search_index.search(search, category=category, tag=tag)
+        page_ids = [post_id for post_id, _ in ranked[skip:skip + limit]]
+        found = {
+            post["id"]: post
+            async for post in db.blog_posts.find({"id": {"$in": page_ids}, "published": True}, BLOG_SUMMARY_PROJECTION)
+        }
+        posts = [found[post_id] for post_id in page_ids if post_id in found]
+        summaries = await apply_featured_image_variant([BlogPostSummary(**post) for post in posts], image_variant)
+        return summaries, blog_validators(summaries)
+    
     # Build query based on filters
     query = {"published": True}
     
@@ -825,52 +3354,324 @@ async def get_blog_posts(
         query["category"] = category
     
     if tag:
-        query["tags"] = {"$in": [tag]}
+        query["tags"] = tag
     
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"content": {"$regex": search, "$options": "i"}},
-            {"excerpt": {"$regex": search, "$options": "i"}}
-        ]
-    
-    posts = await db.blog_posts.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    return [BlogPost(**post) for post in posts]
+    headers = {}
+    if skip and not cursor:
+        # Offset paging is kept for existing clients; deep pages cost O(skip)
+        posts = await db.blog_posts.find(query, BLOG_SUMMARY_PROJECTION).sort(
+            [("created_at", -1), ("id", -1)]
+        ).skip(skip).limit(limit).to_list(limit)
+    else:
+        # Pass the X-Next-Cursor response header back as ?cursor= for the next page
+        posts, next_cursor = await find_page(
+            db.blog_posts, query, [("created_at", -1), ("id", -1)], limit, cursor, BLOG_SUMMARY_PROJECTION
+        )
+        if next_cursor:
+            headers[NEXT_CURSOR_HEADER] = next_cursor
+    summaries = await apply_featured_image_variant([BlogPostSummary(**post) for post in posts], image_variant)
+    return summaries, {**headers, **blog_validators(summaries)}
 
-@api_router.get("/admin/blog", response_model=List[BlogPost])
+@api_router.get("/blog/search", response_model=List[BlogSearchResult])
+async def search_blog_posts(
+    q: str = Query(..., min_length=1),
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: int = Query(default=10, ge=1, le=50),
+    skip: int = Query(default=0, ge=0),
+    snippets: int = Query(default=3, ge=0, le=10),
+    window: int = Query(default=160, ge=40, le=1000)
+):
+    """Search published posts, returning scored hits with highlighted snippets instead of full posts"""
+    index = blog_search_index
+    keys = index.query_terms(q)
+    results = []
+    for post_id, score in index.search(q, category=category, tag=tag, keys=keys)[skip:skip + limit]:
+        results.append(BlogSearchResult(
+            id=post_id,
+            title=index.docs[post_id]["text"]["title"],
+            score=round(score, 4),
+            title_highlights=[list(span) for span in index.highlights(post_id, "title", keys)],
+            snippets=index.snippets(post_id, keys, snippets, window),
+        ))
+    return results
+
+@api_router.get("/admin/blog", response_model=List[BlogPostSummary])
 async def get_all_blog_posts(current_admin: str = Depends(get_current_admin)):
-    posts = await db.blog_posts.find().sort("created_at", -1).to_list(100)
-    return [BlogPost(**post) for post in posts]
+    posts = await db.blog_posts.find({}, BLOG_SUMMARY_PROJECTION).sort("created_at", -1).to_list(100)
+    return [BlogPostSummary(**post) for post in posts]
+
+@api_router.get("/admin/blog/export")
+async def export_blog_posts(current_admin: str = Depends(get_current_admin)):
+    """Stream every post as one JSON object per line, oldest first"""
+    async def lines():
+        cursor = db.blog_posts.find({}, {"_id": 0}).sort("created_at", 1).batch_size(EXPORT_BATCH_SIZE)
+        async for post in cursor:
+            yield json.dumps(jsonable_encoder(post), ensure_ascii=False) + "\n"
+    filename = f"blog-posts-{datetime.utcnow():%Y%m%d-%H%M%S}.ndjson"
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+IMPORT_DERIVED_FIELDS = {"reading_time", "content_html", "content_renderer_version", "updated_at"}
+
+async def prepare_imported_post(line: bytes) -> dict:
+    """Validate one NDJSON line into an upsert, with derived fields recomputed.
+
+    Fields given on the line (and derived ones) are set; defaults for the rest
+    only apply to new posts, so updating an existing post keeps e.g. its
+    created_at and view_count. publish_at follows the same rules as an edit:
+    a future time keeps the post unpublished until then, any other clears it.
+    """
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    data.pop("_id", None)
+    post = BlogPost(**data)
+    if post.language not in LANGUAGES:
+        raise ValueError(f"Unsupported language: {post.language}")
+    post.publish_at = normalize_publish_at(post.publish_at)
+    scheduled = post.publish_at is not None and post.publish_at > datetime.utcnow()
+    if scheduled:
+        post.published = False
+    else:
+        post.publish_at = None
+    post.reading_time = calculate_reading_time(post.content)
+    document = post.dict()
+    document.update(await render_blog_content(post.content))
+    # The revision counter belongs to the stored history, not to the imported data
+    document.pop("revision")
+    post_id = document.pop("id")
+    update = {"$set": {}, "$setOnInsert": {}, "$unset": {}, "$inc": {"revision": 1}}
+    # View counts are stored with the post but are not part of its model
+    if "view_count" in data:
+        if not isinstance(data["view_count"], int) or isinstance(data["view_count"], bool) or data["view_count"] < 0:
+            raise ValueError("view_count must be a non-negative integer")
+        update["$set"]["view_count"] = data["view_count"]
+    if scheduled:
+        update["$set"].update(published=False, publish_at=post.publish_at)
+    elif "publish_at" in data or "published" in data:
+        update["$unset"]["publish_at"] = ""
+    for field, value in document.items():
+        if field in update["$set"] or field in update["$unset"]:
+            continue
+        update["$set" if field in data or field in IMPORT_DERIVED_FIELDS else "$setOnInsert"][field] = value
+    # Servers before MongoDB 5.0 reject empty update operators
+    return {
+        "id": post_id,
+        "update": {operator: fields for operator, fields in update.items() if fields},
+        "publish_at": post.publish_at,
+    }
+
+async def write_import_batch(batch: List[tuple], report: BlogImportReport):
+    """Upsert a batch of (line_number, prepared post) by post id and snapshot each into the revision history"""
+    operations = [UpdateOne({"id": item["id"]}, item["update"], upsert=True) for _, item in batch]
+    failed_indexes = set()
+    try:
+        result = await db.blog_posts.bulk_write(operations, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as error:
+        details = error.details
+        for write_error in details.get("writeErrors", []):
+            failed_indexes.add(write_error["index"])
+            add_import_error(report, batch[write_error["index"]][0], write_error.get("errmsg", "Write failed"))
+    report.created += details.get("nUpserted", 0)
+    report.updated += details.get("nMatched", 0)
+    written = {item["id"] for index, (_, item) in enumerate(batch) if index not in failed_indexes}
+    if not written:
+        return
+    for index, (_, item) in enumerate(batch):
+        if index not in failed_indexes and item["publish_at"]:
+            schedule_publication(item["id"], item["publish_at"])
+    # Snapshot the stored result, which merges the imported fields into any existing post
+    projection = {"_id": 0, "id": 1, "revision": 1, "content": 1, "updated_at": 1, **{field: 1 for field in REVISION_FIELDS}}
+    revisions = [
+        {
+            "id": str(uuid.uuid4()),
+            "post_id": post["id"],
+            "number": post.get("revision", 1),
+            "created_at": post["updated_at"],
+            "kind": "snapshot",
+            "content": post["content"],
+            "fields": {field: post.get(field) for field in REVISION_FIELDS},
+            "changed_fields": sorted(REVISION_FIELDS + ("content",)),
+            "size": len(post["content"].encode("utf-8")),
+        }
+        async for post in db.blog_posts.find({"id": {"$in": list(written)}}, projection)
+    ]
+    try:
+        await db.blog_revisions.insert_many(revisions, ordered=False)
+    except BulkWriteError:
+        logger.exception("Failed to record revisions for imported posts")
+
+def add_import_error(report: BlogImportReport, line_number: int, message: str):
+    report.failed += 1
+    if len(report.errors) < IMPORT_MAX_REPORTED_ERRORS:
+        report.errors.append(ImportLineError(line=line_number, error=message[:500]))
+
+@api_router.post("/admin/blog/import", response_model=BlogImportReport)
+async def import_blog_posts(request: Request, current_admin: str = Depends(get_current_admin)):
+    """Create or replace posts from an NDJSON request body, read as it streams in.
+
+    Each line is one post; posts are matched by id. Invalid lines are reported
+    by line number and skipped without stopping the import.
+    """
+    report = BlogImportReport()
+    batch: List[tuple] = []
+    
+    async def handle(line_number: int, line: bytes):
+        if not line.strip():
+            return
+        report.processed += 1
+        try:
+            batch.append((line_number, await prepare_imported_post(line)))
+        except ValueError as error:  # JSON and validation errors
+            add_import_error(report, line_number, str(error))
+            return
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await write_import_batch(batch, report)
+            batch.clear()
+    
+    buffer = b""
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            await handle(line_number, line)
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            raise HTTPException(status_code=413, detail=f"Line {line_number + 1} exceeds {IMPORT_MAX_LINE_BYTES} bytes")
+    await handle(line_number + 1, buffer)
+    if batch:
+        await write_import_batch(batch, report)
+    
+    if report.created or report.updated:
+        await announce_blog_change()
+        await load_blog_state()
+    return report
+
+@api_router.get("/admin/blog/{post_id}", response_model=BlogPost)
+async def get_blog_post_for_edit(post_id: str, current_admin: str = Depends(get_current_admin)):
+    """Get a full post, drafts included, for the editor"""
+    post = await db.blog_posts.find_one({"id": post_id})
+    if not post:
+        raise HTTPException(status_code=404, detail="Blog post not found")
+    return BlogPost(**post)
+
+@api_router.get("/blog/facets", response_model=BlogFacets)
+async def get_blog_facet_counts():
+    """Get categories and tags of published posts with their post counts, most used first"""
+    async def load():
+        return await get_blog_facets(), {}
+    return await blog_response_cache.respond("blog/facets", {}, load)
+
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(current_admin: str = Depends(get_current_admin)):
+    """Hit/miss and memory figures for the public blog response cache"""
+    return blog_response_cache.stats()
+
+@api_router.get("/admin/cache/coalescing")
+async def get_coalescing_stats(current_admin: str = Depends(get_current_admin)):
+    """How many concurrent identical reads shared a single database call, overall and per key"""
+    return read_flights.stats()
 
 @api_router.get("/blog/categories")
 async def get_blog_categories():
     """Get all available blog categories"""
-    categories = await db.blog_posts.distinct("category", {"published": True})
-    return categories
+    async def load():
+        facets = await get_blog_facets()
+        return [facet.value for facet in facets.categories], {}
+    return await blog_response_cache.respond("blog/categories", {}, load)
 
 @api_router.get("/blog/tags")
 async def get_blog_tags():
     """Get all available blog tags"""
-    # Get all posts and extract unique tags
-    posts = await db.blog_posts.find({"published": True}, {"tags": 1}).to_list(1000)
-    all_tags = []
-    for post in posts:
-        all_tags.extend(post.get("tags", []))
-    unique_tags = list(set(all_tags))
-    return unique_tags
+    async def load():
+        facets = await get_blog_facets()
+        return [facet.value for facet in facets.tags], {}
+    return await blog_response_cache.respond("blog/tags", {}, load)
+
+@api_router.get("/blog/feed.xml")
+async def get_blog_atom_feed(request: Request):
+    """Atom feed of the newest published posts"""
+    return blog_feed.respond("atom", request)
+
+@api_router.get("/blog/feed.json")
+async def get_blog_json_feed(request: Request):
+    """JSON Feed 1.1 of the newest published posts"""
+    return blog_feed.respond("json", request)
+
+@api_router.get("/blog/popular", response_model=List[BlogPostSummary])
+async def get_popular_posts(request: Request, limit: int = Query(default=5, ge=1, le=20), image_variant: Optional[str] = None):
+    """Get the most viewed published posts, with recent views counting most"""
+    async def load():
+        ids = [post_id for post_id, _ in popularity_ranking.top(limit)]
+        found = {
+            post["id"]: post
+            async for post in db.blog_posts.find({"id": {"$in": ids}, "published": True}, BLOG_SUMMARY_PROJECTION)
+        }
+        summaries = await apply_featured_image_variant(
+            [BlogPostSummary(**found[post_id]) for post_id in ids if post_id in found], image_variant
+        )
+        return summaries, blog_validators(summaries)
+    return await blog_response_cache.respond(
+        "blog/popular", dict(limit=limit, image_variant=image_variant), load, request
+    )
 
-@api_router.get("/blog/featured")
-async def get_featured_posts(limit: int = 3):
+@api_router.get("/blog/featured", response_model=List[BlogPostSummary])
+async def get_featured_posts(request: Request, limit: int = 3, image_variant: Optional[str] = None):
     """Get featured blog posts (most recent)"""
-    posts = await db.blog_posts.find({"published": True}).sort("created_at", -1).limit(limit).to_list(limit)
-    return [BlogPost(**post) for post in posts]
+    async def load():
+        posts = await db.blog_posts.find({"published": True}, BLOG_SUMMARY_PROJECTION).sort("created_at", -1).limit(limit).to_list(limit)
+        summaries = await apply_featured_image_variant([BlogPostSummary(**post) for post in posts], image_variant)
+        return summaries, blog_validators(summaries)
+    return await blog_response_cache.respond("blog/featured", dict(limit=limit, image_variant=image_variant), load, request)
+
+@api_router.get("/blog/{post_id}/related", response_model=List[BlogPostSummary])
+async def get_related_posts(post_id: str, request: Request, limit: int = Query(default=3, ge=1, le=RELATED_TOP_K), image_variant: Optional[str] = None):
+    """Get the published posts most similar to a post, by content and shared tags"""
+    async def load():
+        neighbors = related_posts_index.neighbors.get(post_id)
+        if neighbors is None:
+            raise HTTPException(status_code=404, detail="Blog post not found")
+        ids = [neighbor_id for neighbor_id, _ in neighbors[:limit]]
+        found = {
+            post["id"]: post
+            async for post in db.blog_posts.find({"id": {"$in": ids}, "published": True}, BLOG_SUMMARY_PROJECTION)
+        }
+        summaries = await apply_featured_image_variant(
+            [BlogPostSummary(**found[neighbor_id]) for neighbor_id in ids if neighbor_id in found], image_variant
+        )
+        return summaries, blog_validators(summaries)
+    return await blog_response_cache.respond(
+        "blog/related", dict(post_id=post_id, limit=limit, image_variant=image_variant), load, request
+    )
+
+async def rerender_blog_post(post: dict) -> dict:
+    """Bring a post's stored HTML up to the current renderer version"""
+    rendered = await render_blog_content(post["content"])
+    # Matching on the old version keeps a concurrent edit from being overwritten with stale HTML
+    await db.blog_posts.update_one(
+        {"id": post["id"], "content_renderer_version": post.get("content_renderer_version")},
+        {"$set": rendered},
+    )
+    return {**post, **rendered}
 
 @api_router.get("/blog/{post_id}", response_model=BlogPost)
-async def get_blog_post(post_id: str):
-    post = await db.blog_posts.find_one({"id": post_id, "published": True})
-    if not post:
-        raise HTTPException(status_code=404, detail="Blog post not found")
-    return BlogPost(**post)
+async def get_blog_post(post_id: str, request: Request, image_variant: Optional[str] = None):
+    async def load():
+        post = await db.blog_posts.find_one({"id": post_id, "published": True})
+        if not post:
+            raise HTTPException(status_code=404, detail="Blog post not found")
+        if post.get("content_renderer_version") != BLOG_RENDERER_VERSION:
+            post = await rerender_blog_post(post)
+        posts = await apply_featured_image_variant([BlogPost(**post)], image_variant)
+        return posts[0], blog_validators(posts)
+    response = await blog_response_cache.respond("blog/post", dict(post_id=post_id, image_variant=image_variant), load, request)
+    record_view(post_id)
+    return response
 
 @api_router.put("/admin/blog/{post_id}", response_model=BlogPost)
 async def update_blog_post(post_id: str, input: BlogPostUpdate, current_admin: str = Depends(get_current_admin)):
@@ -879,15 +3680,56 @@ async def update_blog_post(post_id: str, input: BlogPostUpdate, current_admin: s
         raise HTTPException(status_code=404, detail="Blog post not found")
     
     update_data = {k: v for k, v in input.dict().items() if v is not None}
+    language = {**post, **update_data}.get("language") or "en"
+    if language not in LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported language: {language}")
     update_data["updated_at"] = datetime.utcnow()
     
+    # A future publish_at puts the post back on schedule. Any other publish_at, or publishing or
+    # unpublishing by hand, takes it off schedule, so a past time the editor sends back cannot
+    # make the scheduler publish the post again
+    provided = input.dict(exclude_unset=True)
+    publish_at = normalize_publish_at(input.publish_at)
+    unset = {}
+    if publish_at and publish_at > update_data["updated_at"]:
+        update_data["publish_at"] = publish_at
+        update_data["published"] = False
+    else:
+        update_data.pop("publish_at", None)
+        if "publish_at" in provided or "published" in provided:
+            unset["publish_at"] = ""
+    
     # Recalculate reading time if content is updated
     if "content" in update_data:
         update_data["reading_time"] = calculate_reading_time(update_data["content"])
+    if "content" in update_data or post.get("content_renderer_version") != BLOG_RENDERER_VERSION:
+        update_data.update(await render_blog_content(update_data.get("content", post["content"])))
     
-    await db.blog_posts.update_one({"id": post_id}, {"$set": update_data})
+    # Posts from before revision history get their stored state as revision 1; the conditional
+    # update lets exactly one of several concurrent edits record it
+    legacy = await db.blog_posts.find_one_and_update(
+        {"id": post_id, "revision": {"$exists": False}},
+        {"$set": {"revision": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if legacy:
+        await record_blog_revision(None, legacy)
     
-    updated_post = await db.blog_posts.find_one({"id": post_id})
+    # The state this update replaced is read atomically, so each revision diffs against its true predecessor
+    previous = await db.blog_posts.find_one_and_update(
+        {"id": post_id},
+        {"$set": update_data, "$inc": {"revision": 1}, **({"$unset": unset} if unset else {})},
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Blog post not found")
+    updated_post = {**previous, **update_data, "revision": previous["revision"] + 1}
+    for field in unset:
+        updated_post.pop(field, None)
+    await record_blog_revision(previous, updated_post)
+    await blog_post_changed(post_id, updated_post)
+    if update_data.get("publish_at"):
+        schedule_publication(post_id, update_data["publish_at"])
     return BlogPost(**updated_post)
 
 @api_router.delete("/admin/blog/{post_id}")
@@ -895,8 +3737,26 @@ async def delete_blog_post(post_id: str, current_admin: str = Depends(get_curren
     result = await db.blog_posts.delete_one({"id": post_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Blog post not found")
+    await db.blog_revisions.delete_many({"post_id": post_id})
+    await blog_post_changed(post_id, None)
     return {"message": "Blog post deleted successfully"}
 
+@api_router.get("/admin/blog/{post_id}/revisions", response_model=List[BlogRevision])
+async def get_blog_revisions(post_id: str, current_admin: str = Depends(get_current_admin)):
+    """List a post's revisions, newest first, without their content"""
+    revisions = await db.blog_revisions.find(
+        {"post_id": post_id}, {"content": 0, "delta": 0, "fields": 0}
+    ).sort("number", -1).to_list(None)
+    return [BlogRevision(**revision) for revision in revisions]
+
+@api_router.get("/admin/blog/{post_id}/revisions/{number}", response_model=BlogRevisionContent)
+async def get_blog_revision(post_id: str, number: int, current_admin: str = Depends(get_current_admin)):
+    """Reconstruct a post as it was at a given revision"""
+    revision = await reconstruct_blog_revision(post_id, number)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return BlogRevisionContent(**revision)
+
 # Contact endpoints
 @api_router.post("/contact", response_model=ContactMessage)
 async def create_contact_message(input: ContactMessageCreate):
@@ -928,6 +3788,209 @@ async def get_newsletter_subscriptions(current_admin: str = Depends(get_current_
     subscriptions = await db.newsletter_subscriptions.find().sort("subscribed_at", -1).to_list(100)
     return [NewsletterSubscription(**sub) for sub in subscriptions]
 
+# Media serving
+# Replaces a plain StaticFiles mount so that seeking-heavy video clients get byte ranges
+# and repeat visitors can revalidate instead of downloading files again.
+class MediaFileResponse(Response):
+    """Stream a file, or byte ranges of it, without loading it into memory.
+    
+    Uses the ASGI zero-copy (sendfile) or pathsend extensions when the server offers
+    them and falls back to chunked reads otherwise.
+    """
+    
+    def __init__(self, path: Path, file_size: int, ranges: List[tuple], status_code: int,
+                 headers: Dict[str, str], media_type: str, send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.send_body = send_body
+        self.trailer = b""
+        if len(ranges) > 1:
+            boundary = uuid.uuid4().hex
+            self.parts = []
+            for i, (start, end) in enumerate(ranges):
+                separator = b"\r\n" if i else b""
+                part_headers = (
+                    f"--{boundary}\r\n"
+                    f"Content-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+                )
+                self.parts.append((separator + part_headers.encode("latin-1"), start, end))
+            self.trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        else:
+            start, end = ranges[0] if ranges else (0, file_size - 1)
+            self.parts = [(b"", start, end)]
+            self.headers["content-type"] = media_type
+        content_length = len(self.trailer) + sum(len(p) + end - start + 1 for p, start, end in self.parts)
+        self.headers["content-length"] = str(content_length)
+        self.is_whole_file = len(ranges) == 0
+    
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        
+        extensions = scope.get("extensions") or {}
+        if self.is_whole_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+        
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, 'rb') as f:
+                for prefix, start, end in self.parts:
+                    if prefix:
+                        await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True
+                    })
+            await send({"type": "http.response.body", "body": self.trailer, "more_body": False})
+            return
+        
+        async with aiofiles.open(self.path, 'rb') as f:
+            for prefix, start, end in self.parts:
+                if prefix:
+                    await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                await f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = await f.read(min(UPLOAD_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": self.trailer, "more_body": False})
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[tuple]]:
+    """Parse a bytes Range header into sorted, merged (start, end) pairs.
+    
+    Returns None when the header should be ignored and an empty list when no range is satisfiable.
+    """
+    unit, _, specs = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+    ranges = []
+    for spec in specs.split(","):
+        first, dash, last = spec.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else file_size - 1
+                if last and end < start:
+                    return None
+            else:
+                suffix_length = int(last)
+                if suffix_length == 0:
+                    # An empty suffix can never be satisfied
+                    continue
+                start = max(file_size - suffix_length, 0)
+                end = file_size - 1
+        except ValueError:
+            return None
+        if start < file_size:
+            ranges.append((start, min(end, file_size - 1)))
+    
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    if len(merged) > MAX_BYTE_RANGES:
+        return None
+    return merged
+
+def etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since.timestamp()
+
+@app.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_upload(file_path: str, request: Request):
+    key = posixpath.normpath(file_path)
+    relative = Path(key)
+    if key.startswith(("..", "/", ".")) or relative.parts[0] in PRIVATE_UPLOAD_DIRS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        path = media_storage.local_path(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if path is None:
+        # The bytes live in object storage: let the client fetch them from there directly
+        return RedirectResponse(await media_storage.url(key), status_code=307)
+    try:
+        stat = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    # Stored files are written once, so inode, size and mtime identify the exact bytes
+    etag = f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    # uuid-named originals, hash-addressed variants and per-run HLS output never change in
+    # place (playlists are still revalidated, as older transcodes rewrote them in place)
+    immutable = (
+        UUID_FILENAME_RE.match(path.name)
+        or relative.parts[0] == "variants"
+        or (relative.parts[0] == "hls" and path.suffix != ".m3u8")
+    )
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        "accept-ranges": "bytes",
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if (if_none_match and etag_matches(if_none_match, etag)) or (
+        not if_none_match and if_modified_since and not_modified_since(if_modified_since, stat.st_mtime)
+    ):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    send_body = request.method == "GET"
+    ranges = []
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A stale If-Range validator means the client's partial copy is outdated: send everything
+    if range_header and (not if_range or if_range.strip() == etag or if_range.strip() == headers["last-modified"]):
+        ranges = parse_range_header(range_header, stat.st_size)
+        if ranges is None:
+            ranges = []
+        elif not ranges:
+            return Response(
+                status_code=416,
+                headers={**headers, "content-range": f"bytes */{stat.st_size}"}
+            )
+    
+    if len(ranges) == 1 and ranges[0] == (0, stat.st_size - 1):
+        ranges = []
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["content-range"] = f"bytes {start}-{end}/{stat.st_size}"
+    if stat.st_size == 0:
+        return Response(status_code=200, headers=headers, media_type=media_type)
+    return MediaFileResponse(
+        path, stat.st_size, ranges, 206 if ranges else 200, headers, media_type, send_body
+    )
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -937,6 +4000,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Configure logging
@@ -946,6 +4010,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def ensure_indexes():
+    await db.media_blobs.create_index("sha256", unique=True)
+    await db.media_blobs.create_index("storage_key")
+    await db.media_files.create_index("content_hash")
+    await db.media_files.create_index("file_path")
+    await db.media_files.create_index(
+        [("is_active", 1), ("file_type", 1), ("category", 1), ("upload_date", -1), ("id", -1)]
+    )
+    await db.media_files.create_index([("is_active", 1), ("upload_date", -1), ("id", -1)])
+    for field in ("file_size", "width", "height", "duration"):
+        await db.media_files.create_index([("is_active", 1), (field, 1), ("id", 1)])
+    await db.media_jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.media_jobs.create_index("content_hash")
+    await db.blog_posts.create_index("id")
+    await db.blog_posts.create_index([("published", 1), ("created_at", -1), ("id", -1)])
+    await db.blog_posts.create_index([("published", 1), ("category", 1), ("created_at", -1), ("id", -1)])
+    await db.blog_posts.create_index([("published", 1), ("tags", 1), ("created_at", -1), ("id", -1)])
+    await db.blog_posts.create_index([("published", 1), ("publish_at", 1)])
+    await db.blog_revisions.create_index([("post_id", 1), ("number", 1)], unique=True)
+    await db.blog_revisions.create_index([("post_id", 1), ("kind", 1), ("number", -1)])
+
+@app.on_event("startup")
+async def start_background_tasks():
+    await ensure_indexes()
+    await load_blog_state()
+    await load_popularity_ranking()
+    app.state.background_tasks = [
+        asyncio.create_task(upload_session_gc_loop()),
+        asyncio.create_task(publish_scheduler_loop()),
+        asyncio.create_task(view_flush_loop()),
+        asyncio.create_task(blog_state_sync_loop()),
+        *[asyncio.create_task(media_job_worker()) for _ in range(MEDIA_JOB_WORKERS)],
+    ]
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in [*getattr(app.state, "background_tasks", []), related_rebuild_task]:
+        if task is not None:
+            task.cancel()
+    if media_process_pool is not None:
+        media_process_pool.shutdown(wait=False, cancel_futures=True)
+    await flush_view_counts()
     client.close()
\ No newline at end of file
@@ -243,7 +243,7 @@ const MediaManager = ({ token }) => {
             <div className="aspect-w-16 aspect-h-9">
               {file.file_type === 'image' ? (
                 <img
-                  src={`${BACKEND_URL}${file.file_path}`}
+                  src={`${BACKEND_URL}${file.variants?.thumbnail || file.file_path}`}
                   alt={file.description || file.original_filename}
                   className="w-full h-48 object-cover"
                 />
@@ -293,6 +293,13 @@ const MediaManager = ({ token }) => {
   );
 };
 
+// Server datetimes are naive UTC; datetime-local inputs want local "YYYY-MM-DDTHH:mm"
+const toLocalInputValue = (value) => {
+  if (!value) return '';
+  const date = new Date(value.endsWith('Z') ? value : `${value}Z`);
+  return new Date(date.getTime() - date.getTimezoneOffset() * 60000).toISOString().slice(0, 16);
+};
+
 // Blog Manager Component
 const BlogManager = ({ token }) => {
   const [posts, setPosts] = useState([]);
@@ -307,7 +314,8 @@ const BlogManager = ({ token }) => {
     featured_image: '',
     featured_video: '',
     paper_type: '',
-    published: true
+    published: true,
+    publish_at: ''
   });
 
   useEffect(() => {
@@ -330,6 +338,7 @@ const BlogManager = ({ token }) => {
     const postData = {
       ...formData,
       tags: formData.tags.split(',').map(tag => tag.trim()).filter(tag => tag),
+      publish_at: formData.publish_at ? new Date(formData.publish_at).toISOString() : null,
       academic_info: formData.paper_type ? {
         type: formData.paper_type,
         institution: "Mount Kenya University",
@@ -368,13 +377,25 @@ const BlogManager = ({ token }) => {
       featured_image: '',
       featured_video: '',
       paper_type: '',
-      published: true
+      published: true,
+      publish_at: ''
     });
     setSelectedPost(null);
     setIsEditing(false);
   };
 
-  const editPost = (post) => {
+  // The list only carries post summaries, so load the full body before editing
+  const editPost = async (summary) => {
+    let post = summary;
+    try {
+      const response = await axios.get(`${API}/admin/blog/${summary.id}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      post = response.data;
+    } catch (error) {
+      console.error('Error fetching post:', error);
+      return;
+    }
     setSelectedPost(post);
     setIsEditing(true);
     setFormData({
@@ -386,7 +407,8 @@ const BlogManager = ({ token }) => {
       featured_image: post.featured_image || '',
       featured_video: post.featured_video || '',
       paper_type: post.paper_type || '',
-      published: post.published
+      published: post.published,
+      publish_at: toLocalInputValue(post.publish_at)
     });
   };
 
@@ -540,6 +562,18 @@ const BlogManager = ({ token }) => {
                 Published
               </label>
             </div>
+            
+            <div>
+              <label className="block text-sm font-medium text-gray-700 mb-2">
+                Publish At (leave empty to publish immediately)
+              </label>
+              <input
+                type="datetime-local"
+                value={formData.publish_at}
+                onChange={(e) => setFormData({...formData, publish_at: e.target.value})}
+                className="w-full px-3 py-2 border border-gray-300 rounded-md"
+              />
+            </div>
           </div>
           
           <div className="flex space-x-4">
@@ -605,7 +639,7 @@ const BlogManager = ({ token }) => {
                     <span className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${
                       post.published ? 'bg-green-100 text-green-800' : 'bg-red-100 text-red-800'
                     }`}>
-                      {post.published ? 'Published' : 'Draft'}
+                      {post.published ? 'Published' : post.publish_at ? 'Scheduled' : 'Draft'}
                     </span>
                   </td>
                   <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef, useCallback } from "react";
 import { BrowserRouter, Routes, Route, useParams, Link } from "react-router-dom";
 import axios from "axios";
 import AdminPanel from "./AdminPanel";
@@ -208,20 +208,28 @@ const BlogList = () => {
   const [selectedCategory, setSelectedCategory] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const sentinelRef = useRef(null);
 
   useEffect(() => {
     fetchPosts();
     fetchCategories();
   }, [selectedCategory, searchTerm]);
 
+  const buildParams = () => {
+    const params = new URLSearchParams();
+    if (selectedCategory) params.append('category', selectedCategory);
+    if (searchTerm) params.append('search', searchTerm);
+    params.append('image_variant', 'medium');
+    return params;
+  };
+
   const fetchPosts = async () => {
     try {
-      const params = new URLSearchParams();
-      if (selectedCategory) params.append('category', selectedCategory);
-      if (searchTerm) params.append('search', searchTerm);
-      
-      const response = await axios.get(`${API}/blog?${params}`);
+      const response = await axios.get(`${API}/blog?${buildParams()}`);
       setPosts(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error fetching posts:', error);
     } finally {
@@ -229,6 +237,33 @@ const BlogList = () => {
     }
   };
 
+  // Each page continues from the cursor of the previous one, so scrolling deep stays cheap
+  const fetchMorePosts = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const params = buildParams();
+      params.append('cursor', nextCursor);
+      const response = await axios.get(`${API}/blog?${params}`);
+      setPosts((current) => [...current, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching more posts:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [nextCursor, loadingMore, selectedCategory, searchTerm]);
+
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextCursor) return;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) fetchMorePosts();
+    }, { rootMargin: '400px' });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [fetchMorePosts, nextCursor]);
+
   const fetchCategories = async () => {
     try {
       const response = await axios.get(`${API}/blog/categories`);
@@ -291,6 +326,14 @@ const BlogList = () => {
           </div>
         )}
 
+        {!loading && nextCursor && (
+          <div ref={sentinelRef} className="flex justify-center py-8">
+            {loadingMore && (
+              <div className="loading-spinner rounded-full h-8 w-8 border-b-2 border-blue-600"></div>
+            )}
+          </div>
+        )}
+
         {!loading && posts.length === 0 && (
           <div className="text-center py-12">
             <p className="text-gray-500 text-lg">No articles found.</p>
@@ -327,8 +370,8 @@ const BlogPost = () => {
 
   const fetchRelatedPosts = async () => {
     try {
-      const response = await axios.get(`${API}/blog?limit=3`);
-      setRelatedPosts(response.data.filter(p => p.id !== id));
+      const response = await axios.get(`${API}/blog/${id}/related?limit=3&image_variant=medium`);
+      setRelatedPosts(response.data);
     } catch (error) {
       console.error('Error fetching related posts:', error);
     }
@@ -409,9 +452,16 @@ const BlogPost = () => {
 
         {/* Content */}
         <div className="prose prose-lg max-w-none mb-8">
-          <div className="whitespace-pre-line text-gray-800 leading-relaxed">
-            {post.content}
-          </div>
+          {post.content_html ? (
+            <div
+              className="text-gray-800 leading-relaxed"
+              dangerouslySetInnerHTML={{ __html: post.content_html }}
+            />
+          ) : (
+            <div className="whitespace-pre-line text-gray-800 leading-relaxed">
+              {post.content}
+            </div>
+          )}
         </div>
 
         {/* Tags */}
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import motor.motor_asyncio
+import mongomock_motor
+import pytest
+from fastapi.testclient import TestClient
+
+# The server connects at import time, so the in-memory client has to be in place first
+motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+# Tests drive the media job queue by hand
+os.environ["MEDIA_JOB_WORKERS"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+async def reset_state():
+    for name in await server.db.list_collection_names():
+        await server.db.drop_collection(name)
+    server.pending_views.clear()
+    server.publish_queue.clear()
+    await server.load_blog_state()
+    await server.load_popularity_ranking()
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    # One app lifetime for the whole session: the background tasks and their asyncio
+    # primitives stay bound to a single event loop
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(app_client):
+    app_client.portal.call(reset_state)
+    return app_client
+
+
+@pytest.fixture
+def run(app_client):
+    """Run a coroutine function on the app's event loop"""
+    return lambda func, *args: app_client.portal.call(func, *args)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Local media storage under tmp_path instead of backend/uploads"""
+    storage = server.LocalMediaStorage(tmp_path / "uploads")
+    monkeypatch.setattr(server, "media_storage", storage)
+    monkeypatch.setattr(server, "UPLOAD_TMP_DIR", tmp_path / "tmp")
+    monkeypatch.setattr(server, "UPLOAD_SESSION_DIR", tmp_path / "partial")
+    (tmp_path / "tmp").mkdir()
+    (tmp_path / "partial").mkdir()
+    return storage
+
+
+@pytest.fixture
+def admin_headers(client):
+    response = client.post(
+        "/api/admin/login",
+        json={"username": server.ADMIN_USERNAME, "password": server.ADMIN_PASSWORD},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def create_post(client, admin_headers):
+    def create(**fields):
+        post = {"title": "Post", "content": "Body text", "excerpt": "Excerpt", **fields}
+        response = client.post("/api/admin/blog", json=post, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
+
+
+@pytest.fixture
+def local_timezone():
+    """Run with the host clock west of UTC, where naive UTC read as local time drifts by hours"""
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/Los_Angeles"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
@@ -0,0 +1,31 @@
+from PIL import Image
+
+import server
+
+SHA256 = "ef" * 32
+
+
+def test_new_image_variants_invalidate_cached_blog_lists(client, run, storage, create_post):
+    key = f"images/ef/ef/{SHA256}.jpg"
+    path = storage.path(key)
+    path.parent.mkdir(parents=True)
+    Image.new("RGB", (1200, 800), "teal").save(path)
+    blob = {"sha256": SHA256, "storage_key": key, "file_path": f"/uploads/{key}", "file_type": "image", "ref_count": 1}
+    run(server.db.media_blobs.insert_one, dict(blob))
+    media = server.MediaFile(
+        filename=path.name, original_filename="cover.jpg", file_path=blob["file_path"], file_type="image",
+        mime_type="image/jpeg", file_size=path.stat().st_size, content_hash=SHA256,
+    )
+    run(server.db.media_files.insert_one, media.dict())
+    create_post(featured_image=blob["file_path"], published=True)
+
+    params = {"image_variant": "thumbnail"}
+    client.get("/api/blog", params=params)
+    response = client.get("/api/blog", params=params)
+    assert response.headers["x-cache"] == "HIT"
+    assert response.json()[0]["featured_image"] == blob["file_path"]
+
+    run(server.process_image_blob, blob)
+    response = client.get("/api/blog", params=params)
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()[0]["featured_image"] == f"/uploads/{server.variant_prefix(SHA256)}/thumbnail.jpg"
@@ -0,0 +1,40 @@
+import json
+from datetime import datetime, timedelta
+
+import server
+
+
+def feed_ids(client):
+    return [item["id"] for item in json.loads(client.get("/api/blog/feed.json").content)["items"]]
+
+
+def insert_post(run, created_at):
+    post = server.BlogPost(title="Post", content="Body", excerpt="Excerpt", published=True, created_at=created_at)
+    run(server.db.blog_posts.insert_one, post.dict())
+    return post
+
+
+def test_feed_keeps_only_the_newest_posts(client, run, admin_headers, monkeypatch):
+    monkeypatch.setattr(server, "FEED_MAX_ENTRIES", 3)
+    start = datetime(2025, 1, 1)
+    posts = [insert_post(run, start + timedelta(days=i)) for i in range(5)]
+    run(server.load_blog_feed)
+    newest_first = [post.id for post in reversed(posts)]
+    assert feed_ids(client) == newest_first[:3]
+    assert len(server.blog_feed.entries) == 3
+
+    # An older post does not enter a full feed
+    backdated = insert_post(run, start - timedelta(days=1))
+    run(server.blog_post_changed, backdated.id, backdated.dict())
+    assert feed_ids(client) == newest_first[:3]
+    assert len(server.blog_feed.entries) == 3
+
+    # Unpublishing a listed post pulls the next newest one in from the database
+    client.put(f"/api/admin/blog/{posts[4].id}", json={"published": False}, headers=admin_headers)
+    assert feed_ids(client) == newest_first[1:4]
+
+    client.delete(f"/api/admin/blog/{posts[3].id}", headers=admin_headers)
+    assert feed_ids(client) == newest_first[2:5]
+
+    run(server.load_blog_feed)
+    assert feed_ids(client) == newest_first[2:5]
@@ -0,0 +1,79 @@
+import json
+from datetime import datetime, timedelta
+
+import server
+
+
+def ndjson(*lines):
+    return "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines) + "\n"
+
+
+def import_posts(client, admin_headers, body):
+    response = client.post("/api/admin/blog/import", content=body.encode(), headers=admin_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def stored(run, post_id):
+    return run(server.db.blog_posts.find_one, {"id": post_id})
+
+
+def test_export_import_round_trip_reports_bad_lines(client, run, admin_headers, create_post):
+    posts = [create_post(title=f"Post {i}", content=f"Body {i}") for i in range(3)]
+    with client.stream("GET", "/api/admin/blog/export", headers=admin_headers) as response:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        exported = [json.loads(line) for line in response.iter_lines() if line]
+    assert sorted(post["id"] for post in exported) == sorted(post["id"] for post in posts)
+
+    created_at = stored(run, posts[2]["id"])["created_at"]
+    exported[0]["content"] = "Changed body"
+    report = import_posts(client, admin_headers, ndjson(
+        exported[0], "not json", [1], {"title": "No content"}, {"id": posts[1]["id"], "title": "Renamed"},
+        {"title": "Brand new", "content": "New", "excerpt": "Excerpt"},
+        {"id": posts[2]["id"], "title": "Partial", "content": "Body 2", "excerpt": "Excerpt"},
+    ))
+    assert (report["processed"], report["created"], report["updated"], report["failed"]) == (7, 1, 2, 4)
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4, 5]
+
+    assert stored(run, exported[0]["id"])["content_html"] == "<p>Changed body</p>"
+    assert stored(run, posts[1]["id"])["title"] == "Post 1"
+    # Fields missing from a line keep their stored values
+    assert stored(run, posts[2]["id"])["title"] == "Partial"
+    assert stored(run, posts[2]["id"])["created_at"] == created_at
+    revisions = client.get(f"/api/admin/blog/{exported[0]['id']}/revisions", headers=admin_headers).json()
+    assert [(revision["number"], revision["kind"]) for revision in revisions] == [(2, "snapshot"), (1, "snapshot")]
+    assert [p["title"] for p in client.get("/api/blog", params={"search": "brand"}).json()] == ["Brand new"]
+
+
+def test_line_with_every_field_sends_no_empty_operator(run):
+    post = server.BlogPost(title="Full", content="Body", excerpt="Excerpt").dict()
+    prepared = run(server.prepare_imported_post, json.dumps(post, default=str).encode())
+    assert prepared["update"]
+    assert all(fields for fields in prepared["update"].values())
+    assert "$setOnInsert" not in prepared["update"]
+
+
+def test_imported_publish_times_follow_the_scheduling_rules(client, run, admin_headers):
+    future = (datetime.utcnow() + timedelta(hours=1)).replace(microsecond=0)
+    scheduled = {"id": "scheduled", "title": "Later", "content": "Body", "excerpt": "Excerpt",
+                 "published": True, "publish_at": future.isoformat()}
+    past = {"id": "past", "title": "Earlier", "content": "Body", "excerpt": "Excerpt",
+            "published": False, "publish_at": (datetime.utcnow() - timedelta(hours=1)).isoformat()}
+    report = import_posts(client, admin_headers, ndjson(scheduled, past))
+    assert report["created"] == 2
+
+    assert stored(run, "scheduled")["published"] is False
+    assert stored(run, "scheduled")["publish_at"] == future
+    assert [post_id for _, post_id, _ in server.publish_queue] == ["scheduled"]
+    assert stored(run, "past")["published"] is False
+    assert stored(run, "past").get("publish_at") is None
+
+
+def test_import_restores_exported_view_counts(client, run, admin_headers, create_post):
+    post = create_post(title="Counted")
+    report = import_posts(client, admin_headers, ndjson(
+        {"id": post["id"], "title": "Counted", "content": "Body", "excerpt": "Excerpt", "view_count": 7},
+        {"title": "Bad count", "content": "Body", "excerpt": "Excerpt", "view_count": -1},
+    ))
+    assert (report["updated"], report["failed"]) == (1, 1)
+    assert stored(run, post["id"])["view_count"] == 7
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+
+def insert_posts(run, count):
+    start = datetime(2025, 1, 1)
+    posts = [
+        server.BlogPost(title=f"Post {i}", content="Body", excerpt="Excerpt", published=True,
+                        created_at=start + timedelta(minutes=i // 2))
+        for i in range(count)
+    ]
+    run(server.db.blog_posts.insert_many, [post.dict() for post in posts])
+    return posts
+
+
+def test_cursor_pages_cover_every_post_once(client, run):
+    posts = insert_posts(run, 23)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/blog", params=params)
+        assert response.status_code == 200
+        seen += [post["id"] for post in response.json()]
+        cursor = response.headers.get(server.NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    # Ties on created_at are broken by id, so nothing is skipped or repeated
+    expected = sorted(posts, key=lambda post: (post.created_at, post.id), reverse=True)
+    assert seen == [post.id for post in expected]
+
+
+@pytest.mark.parametrize("limit", [0, -1, 51])
+def test_out_of_range_limit_is_rejected(client, run, limit):
+    insert_posts(run, 3)
+    assert client.get("/api/blog", params={"limit": limit}).status_code == 422
+
+
+def test_find_page_with_no_room_returns_nothing(client, run):
+    insert_posts(run, 3)
+    assert run(server.find_page, server.db.blog_posts, {}, [("created_at", -1), ("id", -1)], 0) == ([], None)
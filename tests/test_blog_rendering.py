@@ -0,0 +1,23 @@
+import server
+
+
+def test_author_ids_are_namespaced():
+    html = server.render_markdown(
+        "## Overview {#location}\n\nSee [the note](#location)[^1].\n\n"
+        "<div id=\"cookie\" onclick=\"alert(1)\">x</div>\n\n[^1]: Footnote."
+    )
+    assert 'id="location"' not in html
+    assert '<h2 id="user-content-location">' in html
+    assert 'href="#user-content-location"' in html
+    assert 'href="#user-content-fn:1"' in html
+    assert '<li id="user-content-fn:1">' in html
+    assert "cookie" not in html
+    assert "onclick" not in html
+
+
+def test_stored_html_from_older_renderer_is_rerendered(client, run):
+    post = server.BlogPost(title="Post", content="## Heading {#top}", excerpt="Excerpt", published=True)
+    run(server.db.blog_posts.insert_one, {
+        **post.dict(), "content_html": '<h2 id="top">Heading</h2>', "content_renderer_version": 1,
+    })
+    assert client.get(f"/api/blog/{post.id}").json()["content_html"] == '<h2 id="user-content-top">Heading</h2>'
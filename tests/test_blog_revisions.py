@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import server
+
+
+def edit(client, admin_headers, post_id, content):
+    response = client.put(f"/api/admin/blog/{post_id}", json={"content": content}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def revision_numbers(client, admin_headers, post_id):
+    return [(r["number"], r["kind"]) for r in client.get(f"/api/admin/blog/{post_id}/revisions", headers=admin_headers).json()]
+
+
+def revision_content(client, admin_headers, post_id, number):
+    return client.get(f"/api/admin/blog/{post_id}/revisions/{number}", headers=admin_headers)
+
+
+def test_every_revision_can_be_rebuilt(client, admin_headers, create_post):
+    versions = ["line one\nline two\n"]
+    post = create_post(content=versions[0])
+    for i in range(12):
+        versions.append(versions[-1] + f"line {i + 3}\n")
+        edit(client, admin_headers, post["id"], versions[-1])
+
+    kinds = dict(revision_numbers(client, admin_headers, post["id"]))
+    assert sorted(kinds) == list(range(1, 14))
+    assert [n for n, kind in kinds.items() if kind == "snapshot"] == sorted(
+        n for n in kinds if (n - 1) % server.REVISION_SNAPSHOT_INTERVAL == 0
+    )
+    for number, content in enumerate(versions, start=1):
+        assert revision_content(client, admin_headers, post["id"], number).json()["content"] == content
+
+
+def test_concurrent_edits_of_a_legacy_post_number_revisions_contiguously(client, run, admin_headers):
+    legacy = server.BlogPost(title="Legacy", content="original\n", excerpt="Excerpt").dict()
+    del legacy["revision"]
+    run(server.db.blog_posts.insert_one, legacy)
+
+    async def edit_concurrently():
+        await asyncio.gather(*[
+            server.update_blog_post(legacy["id"], server.BlogPostUpdate(content=f"edit {i}\n"), "admin")
+            for i in range(3)
+        ])
+    run(edit_concurrently)
+
+    revisions = revision_numbers(client, admin_headers, legacy["id"])
+    assert sorted(number for number, _ in revisions) == [1, 2, 3, 4]
+    assert revision_content(client, admin_headers, legacy["id"], 1).json()["content"] == "original\n"
+    latest = run(server.db.blog_posts.find_one, {"id": legacy["id"]})
+    assert latest["revision"] == 4
+    assert revision_content(client, admin_headers, legacy["id"], 4).json()["content"] == latest["content"]
+
+
+def test_missing_delta_is_reported_and_the_chain_recovers(client, run, admin_headers, create_post):
+    post = create_post(content="a\n")
+    for content in ("a\nb\n", "a\nb\nc\n", "a\nb\nc\nd\n"):
+        edit(client, admin_headers, post["id"], content)
+    run(server.db.blog_revisions.delete_one, {"post_id": post["id"], "number": 3})
+
+    assert revision_content(client, admin_headers, post["id"], 2).json()["content"] == "a\nb\n"
+    response = revision_content(client, admin_headers, post["id"], 4)
+    assert response.status_code == 409
+    assert revision_content(client, admin_headers, post["id"], 3).status_code == 404
+
+    # Losing the latest revision makes the next one a snapshot instead of a delta on a gap
+    run(server.db.blog_revisions.delete_one, {"post_id": post["id"], "number": 4})
+    edit(client, admin_headers, post["id"], "a\nb\nc\nd\ne\n")
+    assert dict(revision_numbers(client, admin_headers, post["id"]))[5] == "snapshot"
+    assert revision_content(client, admin_headers, post["id"], 5).json()["content"] == "a\nb\nc\nd\ne\n"
+
+
+def test_scheduled_publish_is_recorded_as_a_revision(client, run, admin_headers, create_post):
+    post = create_post(title="Draft", publish_at=(datetime.utcnow() + timedelta(hours=1)).isoformat())
+    publish_at = run(server.db.blog_posts.find_one, {"id": post["id"]})["publish_at"]
+    run(server.publish_due_post, post["id"], publish_at)
+    response = client.put(f"/api/admin/blog/{post['id']}", json={"title": "Live"}, headers=admin_headers)
+    assert response.status_code == 200
+
+    stored = run(server.db.blog_posts.find_one, {"id": post["id"]})
+    assert stored["published"] is True
+    assert stored["revision"] == 3
+    assert revision_content(client, admin_headers, post["id"], 2).json()["fields"]["published"] is True
+    latest = revision_content(client, admin_headers, post["id"], 3).json()
+    assert latest["fields"]["published"] is True
+    assert latest["fields"]["title"] == "Live"
@@ -0,0 +1,67 @@
+import time
+from datetime import datetime, timedelta
+
+import server
+
+
+def stored(run, post_id):
+    return run(server.db.blog_posts.find_one, {"id": post_id})
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_post_unpublished_after_going_live_stays_unpublished(client, run, admin_headers, create_post):
+    publish_at = (datetime.utcnow() + timedelta(seconds=1)).isoformat()
+    post = create_post(publish_at=publish_at)
+    assert post["published"] is False
+
+    wait_until(lambda: stored(run, post["id"])["published"])
+    assert stored(run, post["id"]).get("publish_at") is None
+
+    # The editor sends the original publish time back along with the unpublish
+    response = client.put(
+        f"/api/admin/blog/{post['id']}", json={"published": False, "publish_at": publish_at}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["publish_at"] is None
+    run(server.load_publish_queue)
+    assert server.publish_queue == []
+    time.sleep(0.3)
+    assert stored(run, post["id"])["published"] is False
+
+
+def test_manual_unpublish_cancels_a_pending_schedule(client, run, admin_headers, create_post):
+    post = create_post(publish_at=(datetime.utcnow() + timedelta(seconds=0.5)).isoformat())
+    client.put(f"/api/admin/blog/{post['id']}", json={"published": False}, headers=admin_headers)
+    time.sleep(0.8)
+    assert stored(run, post["id"])["published"] is False
+    assert stored(run, post["id"]).get("publish_at") is None
+
+
+def test_past_publish_time_on_create_publishes_now(client, run, create_post):
+    post = create_post(publish_at=(datetime.utcnow() - timedelta(days=1)).isoformat())
+    assert post["published"] is True
+    assert post["publish_at"] is None
+    run(server.load_publish_queue)
+    assert server.publish_queue == []
+
+
+def test_overdue_draft_is_published_when_the_queue_is_loaded(client, run):
+    # The publish time passed while no server was running
+    publish_at = server.normalize_publish_at(datetime.utcnow() - timedelta(minutes=1))
+    draft = server.BlogPost(title="Draft", content="Body", excerpt="Excerpt", published=False, publish_at=publish_at)
+    run(server.db.blog_posts.insert_one, draft.dict())
+
+    async def load_queue():
+        # Read the queue before the scheduler gets a turn on the loop
+        await server.load_publish_queue()
+        return [post_id for _, post_id, _ in server.publish_queue]
+    assert run(load_queue) == [draft.id]
+
+    wait_until(lambda: stored(run, draft.id)["published"])
+    assert stored(run, draft.id).get("publish_at") is None
@@ -0,0 +1,27 @@
+import server
+
+
+def test_update_of_post_with_unsupported_stored_language_is_rejected(client, run, admin_headers):
+    post = server.BlogPost(title="Legacy", content="Body", excerpt="Excerpt", language="xx")
+    run(server.db.blog_posts.insert_one, post.dict())
+
+    response = client.put(f"/api/admin/blog/{post.id}", json={"title": "Renamed"}, headers=admin_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unsupported language: xx"
+
+    response = client.put(f"/api/admin/blog/{post.id}", json={"title": "Renamed", "language": "fr"}, headers=admin_headers)
+    assert response.status_code == 200
+
+
+def test_search_sees_writes_from_other_processes(client, run, create_post):
+    create_post(title="Local climate notes")
+    assert run(server.db.app_state.find_one, {"_id": "blog"})["generation"] == server.blog_state_generation
+
+    # Another worker writes a post and bumps the shared generation
+    post = server.BlogPost(title="Remote drought report", content="Body", excerpt="Excerpt", published=True)
+    run(server.db.blog_posts.insert_one, post.dict())
+    run(server.db.app_state.update_one, {"_id": "blog"}, {"$inc": {"generation": 1}})
+    assert client.get("/api/blog/search", params={"q": "drought"}).json() == []
+
+    run(server.sync_blog_state)
+    assert [result["id"] for result in client.get("/api/blog/search", params={"q": "drought"}).json()] == [post.id]
@@ -0,0 +1,59 @@
+from pymongo.errors import BulkWriteError
+
+import server
+
+
+def view_counts(run, *post_ids):
+    return [run(server.db.blog_posts.find_one, {"id": post_id}).get("view_count", 0) for post_id in post_ids]
+
+
+def test_views_are_written_behind(client, run, create_post):
+    post = create_post(title="Popular")
+    for _ in range(3):
+        client.get(f"/api/blog/{post['id']}")
+    assert view_counts(run, post["id"]) == [0]
+    run(server.flush_view_counts)
+    assert view_counts(run, post["id"]) == [3]
+    assert server.pending_views == {}
+    assert [p["id"] for p in client.get("/api/blog/popular").json()] == [post["id"]]
+
+
+def test_flushed_views_do_not_change_cached_responses(client, run, create_post):
+    post = create_post(title="Popular")
+    first = client.get(f"/api/blog/{post['id']}")
+    assert "view_count" not in first.json()
+    run(server.flush_view_counts)
+
+    response = client.get(f"/api/blog/{post['id']}", headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 304
+    response = client.get(f"/api/blog/{post['id']}")
+    assert response.content == first.content
+    assert all("view_count" not in summary for summary in client.get("/api/blog").json())
+
+
+def test_partial_flush_failure_requeues_only_the_failed_posts(client, run, create_post, monkeypatch):
+    good = create_post(title="Good")
+    broken = create_post(title="Broken")
+    collection_type = type(server.db.blog_posts)
+    original = collection_type.__getattr__
+
+    async def bulk_write(self, operations, ordered=True):
+        # An unordered bulk write applies every operation it can and reports the rest
+        failed = [index for index, operation in enumerate(operations) if operation._filter["id"] == broken["id"]]
+        applied = [operation for index, operation in enumerate(operations) if index not in failed]
+        original(self, "bulk_write")(applied, ordered=ordered)
+        if failed:
+            raise BulkWriteError({"writeErrors": [{"index": index, "code": 14, "errmsg": "failed"} for index in failed]})
+
+    monkeypatch.setattr(collection_type, "bulk_write", bulk_write, raising=False)
+    for post in (good, broken, good):
+        server.record_view(post["id"])
+
+    run(server.flush_view_counts)
+    assert server.pending_views == {broken["id"]: 1}
+    assert view_counts(run, good["id"], broken["id"]) == [2, 0]
+
+    # The next flush must not count the applied views again
+    monkeypatch.undo()
+    run(server.flush_view_counts)
+    assert view_counts(run, good["id"], broken["id"]) == [2, 1]
@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+from PIL import Image
+
+import server
+
+
+def png_bytes(color):
+    image = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(image, format="PNG")
+    return image.getvalue()
+
+
+def upload(client, admin_headers, data, filename="photo.png"):
+    response = client.post(
+        "/api/admin/media/upload", files={"file": (filename, data, "image/png")}, headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def blob(run, media):
+    return run(server.db.media_blobs.find_one, {"sha256": media["content_hash"]})
+
+
+def wait_for_processing(run):
+    async def drain():
+        while server.media_processing_tasks:
+            await asyncio.gather(*server.media_processing_tasks, return_exceptions=True)
+    run(drain)
+
+
+def test_identical_uploads_share_one_file_until_the_last_is_deleted(client, run, admin_headers, storage):
+    data = png_bytes("teal")
+    first = upload(client, admin_headers, data, "first.png")
+    second = upload(client, admin_headers, data, "second.png")
+    other = upload(client, admin_headers, png_bytes("navy"))
+    wait_for_processing(run)
+
+    assert first["id"] != second["id"]
+    assert first["file_path"] == second["file_path"] != other["file_path"]
+    assert blob(run, first)["ref_count"] == 2
+    path = storage.path(server.storage_key_for(first["file_path"]))
+    variants = storage.path(server.variant_prefix(first["content_hash"]))
+    assert variants.exists()
+
+    assert client.delete(f"/api/admin/media/{first['id']}", headers=admin_headers).status_code == 200
+    assert blob(run, second)["ref_count"] == 1
+    assert path.exists()
+    # Deleting the same record again must not release the shared bytes a second time
+    client.delete(f"/api/admin/media/{first['id']}", headers=admin_headers)
+    assert blob(run, second)["ref_count"] == 1
+
+    assert client.delete(f"/api/admin/media/{second['id']}", headers=admin_headers).status_code == 200
+    assert blob(run, second) is None
+    assert not path.exists()
+    assert not variants.exists()
+    assert storage.path(server.storage_key_for(other["file_path"])).exists()
+
+
+def test_concurrent_deletes_release_the_blob_once(client, run, admin_headers, storage):
+    data = png_bytes("teal")
+    records = [upload(client, admin_headers, data, f"copy{i}.png") for i in range(3)]
+    wait_for_processing(run)
+    documents = [run(server.db.media_files.find_one, {"id": media["id"]}) for media in records]
+
+    async def release_all():
+        await asyncio.gather(*[server.release_media_blob(document) for document in documents])
+    run(release_all)
+
+    assert blob(run, records[0]) is None
+    assert not storage.path(server.storage_key_for(records[0]["file_path"])).exists()
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+SHA256 = "ab" * 32
+
+
+@pytest.fixture
+def fake_transcode(monkeypatch):
+    runs = []
+
+    async def transcode_to_hls(source_path, output_dir):
+        runs.append(output_dir)
+        output_dir.mkdir(parents=True)
+        (output_dir / "master.m3u8").write_text(f"#EXTM3U\n# run {len(runs)}\n")
+        (output_dir / "360p_0000.ts").write_bytes(f"segment {len(runs)}".encode())
+        (output_dir / "poster.jpg").write_bytes(b"poster")
+
+    monkeypatch.setattr(server, "transcode_to_hls", transcode_to_hls)
+    return runs
+
+
+def insert_blob(run):
+    run(server.db.media_blobs.insert_one, {
+        "sha256": SHA256,
+        "storage_key": "videos/ab/ab/clip.mp4",
+        "file_path": "/uploads/videos/ab/ab/clip.mp4",
+        "file_type": "video",
+        "ref_count": 1,
+    })
+
+
+def queue_job(run, **fields):
+    job = server.MediaJob(content_hash=SHA256, source_path="/uploads/videos/ab/ab/clip.mp4", **fields)
+    run(server.db.media_jobs.insert_one, job.dict())
+    return job
+
+
+def test_retranscode_publishes_a_new_immutable_directory(client, run, storage, fake_transcode):
+    insert_blob(run)
+    manifests = []
+    for _ in range(2):
+        job = queue_job(run)
+        claimed = run(server.claim_media_job)
+        assert claimed["id"] == job.id
+        run(server.run_media_job, claimed)
+        manifests.append(run(server.db.media_blobs.find_one, {"sha256": SHA256})["hls_manifest"])
+
+    assert manifests[0] != manifests[1]
+    # The first run's files are gone rather than rewritten under the same URL
+    assert not storage.path(server.storage_key_for(manifests[0])).exists()
+    segment = manifests[1].replace("master.m3u8", "360p_0000.ts")
+    response = client.get(segment)
+    assert response.content == b"segment 2"
+    assert response.headers["cache-control"] == server.IMMUTABLE_CACHE_CONTROL
+    assert client.get(manifests[1]).headers["cache-control"] == server.REVALIDATE_CACHE_CONTROL
+
+
+def test_running_job_is_only_reclaimed_after_its_lease_expires(client, run):
+    now = datetime.utcnow()
+    queue_job(run, status="running", attempts=1, lease_id="live", lease_expires_at=now + timedelta(minutes=1))
+    assert run(server.claim_media_job) is None
+
+    stale = queue_job(run, status="running", attempts=1, lease_id="dead", lease_expires_at=now - timedelta(minutes=1))
+    claimed = run(server.claim_media_job)
+    assert claimed["id"] == stale.id
+    assert claimed["lease_id"] not in (None, "dead")
+    assert claimed["attempts"] == 2
+
+
+def test_worker_that_lost_its_lease_does_not_publish(client, run, storage, fake_transcode):
+    insert_blob(run)
+    queue_job(run)
+    first = run(server.claim_media_job)
+    # Another worker takes the job over after the first one's lease lapsed
+    run(server.db.media_jobs.update_one, {"id": first["id"]}, {"$set": {"lease_id": "other"}})
+    run(server.run_media_job, first)
+
+    assert run(server.db.media_blobs.find_one, {"sha256": SHA256}).get("hls_manifest") is None
+    assert not storage.path(f"{server.hls_prefix(SHA256)}/{first['lease_id']}").exists()
+    assert run(server.db.media_jobs.find_one, {"id": first["id"]})["status"] == "running"
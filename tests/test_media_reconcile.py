@@ -0,0 +1,27 @@
+import server
+
+
+def test_recent_unreferenced_file_is_kept(client, run, storage, local_timezone):
+    fresh = storage.path("images/ab/cd/fresh.jpg")
+    fresh.parent.mkdir(parents=True)
+    fresh.write_bytes(b"uploaded a moment ago")
+
+    report = server.ReconcileReport(remove_orphans=True)
+    run(server.run_reconciliation, report)
+    assert report.status == "completed"
+    assert report.files_scanned == 1
+    assert report.orphaned_files == 0
+    assert fresh.exists()
+
+
+def test_settled_unreferenced_file_is_removed(client, run, storage, monkeypatch):
+    monkeypatch.setattr(server, "RECONCILE_GRACE_SECONDS", -60)
+    orphan = storage.path("images/ab/cd/orphan.jpg")
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"nobody points here")
+
+    report = server.ReconcileReport(remove_orphans=True)
+    run(server.run_reconciliation, report)
+    assert report.orphan_samples == ["images/ab/cd/orphan.jpg"]
+    assert report.removed_files == 1
+    assert not orphan.exists()
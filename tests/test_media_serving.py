@@ -0,0 +1,118 @@
+import re
+
+import pytest
+
+import server
+
+DATA = bytes(range(256)) * 4
+KEY = "images/ab/cd/document.txt"
+
+
+@pytest.fixture
+def stored_file(storage):
+    path = storage.path(KEY)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(DATA)
+    return f"/uploads/{KEY}"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", [(0, 9)]),
+    ("bytes=-100", [(924, 1023)]),
+    ("bytes=-5000", [(0, 1023)]),
+    ("bytes=1000-", [(1000, 1023)]),
+    ("bytes=0-9,5-20,22-30", [(0, 20), (22, 30)]),
+    ("bytes=10-19, 0-9", [(0, 19)]),
+    ("bytes=1000-5000", [(1000, 1023)]),
+    ("bytes=2000-", []),
+    ("bytes=-0", []),
+    ("items=0-9", None),
+    ("bytes=9-0", None),
+    ("bytes=a-b", None),
+    ("bytes=0", None),
+    ("bytes=" + ",".join(f"{i * 10}-{i * 10}" for i in range(server.MAX_BYTE_RANGES + 1)), None),
+])
+def test_parse_range_header(header, expected):
+    assert server.parse_range_header(header, len(DATA)) == expected
+
+
+def test_single_range(client, stored_file):
+    response = client.get(stored_file, headers={"Range": "bytes=-100"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 924-1023/1024"
+    assert response.headers["content-length"] == "100"
+    assert response.content == DATA[924:]
+
+
+def test_whole_file_range_is_a_plain_response(client, stored_file):
+    response = client.get(stored_file, headers={"Range": "bytes=0-"})
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+    assert response.content == DATA
+
+
+def test_unsatisfiable_range(client, stored_file):
+    response = client.get(stored_file, headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_invalid_range_is_ignored(client, stored_file):
+    response = client.get(stored_file, headers={"Range": "bytes=9-0"})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_multiple_ranges_are_sent_as_multipart(client, stored_file):
+    response = client.get(stored_file, headers={"Range": "bytes=0-9,500-509,5-12"})
+    assert response.status_code == 206
+    boundary = re.fullmatch(r"multipart/byteranges; boundary=(\w+)", response.headers["content-type"]).group(1)
+    assert int(response.headers["content-length"]) == len(response.content)
+
+    body = response.content
+    assert body.startswith(f"--{boundary}\r\n".encode())
+    assert body.endswith(f"\r\n--{boundary}--\r\n".encode())
+    parts = body[:-len(f"\r\n--{boundary}--\r\n")].split(f"--{boundary}\r\n".encode())[1:]
+    assert len(parts) == 2
+    for part, (start, end) in zip(parts, [(0, 12), (500, 509)]):
+        head, _, content = part.partition(b"\r\n\r\n")
+        assert f"Content-Range: bytes {start}-{end}/1024".encode() in head
+        assert b"Content-Type: text/plain" in head
+        assert content.removesuffix(b"\r\n") == DATA[start:end + 1]
+
+
+def test_if_range(client, stored_file):
+    etag = client.head(stored_file).headers["etag"]
+    response = client.get(stored_file, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == DATA[:10]
+
+    response = client.get(stored_file, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_head_sends_headers_only(client, stored_file):
+    response = client.head(stored_file)
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(DATA))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.content == b""
+
+    response = client.head(stored_file, headers={"Range": "bytes=0-9,20-29"})
+    assert response.status_code == 206
+    assert int(response.headers["content-length"]) > 20
+    assert response.content == b""
+
+
+def test_conditional_requests(client, stored_file):
+    response = client.get(stored_file)
+    assert client.get(stored_file, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get(stored_file, headers={"If-Modified-Since": response.headers["last-modified"]}).status_code == 304
+    assert client.get(stored_file, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_private_and_missing_paths_are_not_found(client, stored_file):
+    assert client.get("/uploads/partial/anything.json").status_code == 404
+    assert client.get("/uploads/images/ab/cd/missing.txt").status_code == 404
+    assert client.get("/uploads/images/ab").status_code == 404
@@ -0,0 +1,151 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+import server
+
+BUCKET = "media"
+
+
+@pytest.fixture
+def s3_storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(server, "UPLOAD_TMP_DIR", tmp_path)
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield server.S3MediaStorage(BUCKET, region="us-east-1")
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class PartialStorage(server.MediaStorage):
+        async def save(self, local_path, key, content_type=None):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialStorage()
+
+
+def test_s3_round_trip(run, tmp_path, s3_storage):
+    source = write(tmp_path, "upload.jpg", b"image bytes")
+    run(s3_storage.save, source, "images/ab/cd/photo.jpg")
+    assert not source.exists()
+    assert run(s3_storage.exists, "images/ab/cd/photo.jpg")
+    assert not run(s3_storage.exists, "images/ab/cd/missing.jpg")
+
+    async def read_copy():
+        async with s3_storage.local_copy("images/ab/cd/photo.jpg") as path:
+            return path.read_bytes(), path
+    data, copy_path = run(read_copy)
+    assert data == b"image bytes"
+    assert not copy_path.exists()
+
+    tree = tmp_path / "tree"
+    (tree / "nested").mkdir(parents=True)
+    write(tree, "thumbnail.jpg", b"t")
+    write(tree / "nested", "medium.jpg", b"mm")
+    run(s3_storage.save_tree, tree, "variants/ab/cd/hash")
+
+    async def listing():
+        return [entry async for batch in s3_storage.list_batches("variants", 1) for entry in batch]
+    assert sorted((key, size) for key, size, _ in run(listing)) == [
+        ("variants/ab/cd/hash/nested/medium.jpg", 2),
+        ("variants/ab/cd/hash/thumbnail.jpg", 1),
+    ]
+
+    run(s3_storage.delete_prefix, "variants/ab/cd/hash")
+    assert run(listing) == []
+    run(s3_storage.delete, "images/ab/cd/photo.jpg")
+    assert not run(s3_storage.exists, "images/ab/cd/photo.jpg")
+
+
+def test_uploads_redirect_to_object_storage(client, run, tmp_path, s3_storage, monkeypatch):
+    monkeypatch.setattr(server, "media_storage", s3_storage)
+    run(s3_storage.save, write(tmp_path, "clip.mp4", b"video"), "videos/ab/cd/clip.mp4")
+
+    response = client.get("/uploads/videos/ab/cd/clip.mp4", follow_redirects=False)
+    assert response.status_code == 307
+    assert "/videos/ab/cd/clip.mp4?" in response.headers["location"]
+    assert "Signature=" in response.headers["location"]
+
+    s3_storage.public_url = "https://cdn.example.com"
+    response = client.get("/uploads/videos/ab/cd/clip.mp4", follow_redirects=False)
+    assert response.headers["location"] == "https://cdn.example.com/videos/ab/cd/clip.mp4"
+
+
+def test_hls_needs_urls_that_resolve_segments(tmp_path, s3_storage):
+    assert server.LocalMediaStorage(tmp_path / "uploads").supports_hls
+    # Presigned playlist URLs do not sign the segments next to them
+    assert not s3_storage.supports_hls
+    s3_storage.public_url = "https://cdn.example.com"
+    assert s3_storage.supports_hls
+
+
+def insert_video(run, sha256):
+    run(server.db.media_blobs.insert_one, {
+        "sha256": sha256,
+        "storage_key": f"videos/{sha256[:2]}/{sha256[2:4]}/clip.mp4",
+        "file_path": f"/uploads/videos/{sha256[:2]}/{sha256[2:4]}/clip.mp4",
+        "file_type": "video",
+        "ref_count": 1,
+    })
+    media = server.MediaFile(
+        filename="clip.mp4", original_filename="clip.mp4", file_type="video", mime_type="video/mp4",
+        file_path=f"/uploads/videos/{sha256[:2]}/{sha256[2:4]}/clip.mp4", file_size=5, content_hash=sha256,
+    )
+    run(server.db.media_files.insert_one, media.dict())
+    return media
+
+
+def test_transcode_needs_a_public_url_on_s3(client, run, admin_headers, s3_storage, monkeypatch):
+    monkeypatch.setattr(server, "media_storage", s3_storage)
+    media = insert_video(run, "ab" * 32)
+
+    response = client.post(f"/api/admin/media/{media.id}/transcode", headers=admin_headers)
+    assert response.status_code == 409
+    assert run(server.db.media_jobs.count_documents, {}) == 0
+
+    s3_storage.public_url = "https://cdn.example.com"
+    response = client.post(f"/api/admin/media/{media.id}/transcode", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "queued"
+
+
+def test_queued_transcode_fails_after_a_switch_to_private_s3(client, run, s3_storage, monkeypatch):
+    monkeypatch.setattr(server, "media_storage", s3_storage)
+    media = insert_video(run, "ab" * 32)
+    job = server.MediaJob(content_hash=media.content_hash, source_path=media.file_path)
+    run(server.db.media_jobs.insert_one, job.dict())
+
+    run(server.run_media_job, run(server.claim_media_job))
+    assert run(server.db.media_jobs.find_one, {"id": job.id})["status"] == "failed"
+    assert run(server.db.media_blobs.find_one, {"sha256": media.content_hash})["transcode_status"] == "failed"
+
+
+def test_reconciliation_lists_s3_storage(client, run, tmp_path, s3_storage, monkeypatch):
+    monkeypatch.setattr(server, "media_storage", s3_storage)
+    monkeypatch.setattr(server, "RECONCILE_GRACE_SECONDS", -60)
+    live, dead = "ab" * 32, "cd" * 32
+    insert_video(run, live)
+    for key in (
+        "videos/ab/ab/clip.mp4",
+        f"{server.hls_prefix(live)}/run/master.m3u8",
+        f"{server.hls_prefix(dead)}/run/master.m3u8",
+        "images/cd/cd/orphan.jpg",
+    ):
+        run(s3_storage.save, write(tmp_path, "file", b"bytes"), key)
+
+    report = server.ReconcileReport(remove_orphans=True)
+    run(server.run_reconciliation, report)
+    assert report.status == "completed"
+    assert report.files_scanned == 4
+    assert sorted(report.orphan_samples) == [f"{server.hls_prefix(dead)}/run/master.m3u8", "images/cd/cd/orphan.jpg"]
+    assert run(s3_storage.exists, f"{server.hls_prefix(live)}/run/master.m3u8")
+    assert not run(s3_storage.exists, "images/cd/cd/orphan.jpg")
+    assert report.missing_files == 0
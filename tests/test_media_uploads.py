@@ -0,0 +1,101 @@
+import hashlib
+import io
+import os
+import time
+
+from PIL import Image
+
+import server
+
+
+def start_session(client, admin_headers, data, content_type="image/png"):
+    response = client.post(
+        "/api/admin/media/uploads",
+        json={"filename": "upload.png", "content_type": content_type, "total_size": len(data)},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["upload_id"]
+
+
+def age(path, hours):
+    stamp = time.time() - hours * 3600
+    os.utime(path, (stamp, stamp))
+
+
+def test_upload_sessions_expire_after_the_ttl(client, admin_headers, storage, local_timezone):
+    fresh = start_session(client, admin_headers, b"fresh")
+    stale = start_session(client, admin_headers, b"stale")
+    for upload_id, hours in ((fresh, server.UPLOAD_SESSION_TTL_HOURS - 4), (stale, server.UPLOAD_SESSION_TTL_HOURS + 1)):
+        for path in server.upload_session_paths(upload_id):
+            age(path, hours)
+    leftover = server.UPLOAD_TMP_DIR / "interrupted"
+    leftover.write_bytes(b"partial upload")
+    age(leftover, server.UPLOAD_SESSION_TTL_HOURS - 4)
+
+    assert server.remove_stale_upload_sessions() == 1
+    assert client.get(f"/api/admin/media/uploads/{fresh}", headers=admin_headers).status_code == 200
+    assert client.get(f"/api/admin/media/uploads/{stale}", headers=admin_headers).status_code == 404
+    assert leftover.exists()
+
+
+def png_bytes():
+    image = io.BytesIO()
+    Image.new("RGB", (40, 30), "teal").save(image, format="PNG")
+    return image.getvalue()
+
+
+def put_chunk(client, admin_headers, upload_id, offset, data):
+    return client.put(
+        f"/api/admin/media/uploads/{upload_id}", params={"offset": offset}, content=data, headers=admin_headers
+    )
+
+
+def test_resumable_upload(client, admin_headers, storage):
+    data = png_bytes()
+    upload_id = start_session(client, admin_headers, data)
+    middle = len(data) // 2
+
+    assert put_chunk(client, admin_headers, upload_id, 0, data[:middle]).json()["offset"] == middle
+    # A retried chunk at a stale offset is refused with the offset to resume from
+    response = put_chunk(client, admin_headers, upload_id, 0, data[:middle])
+    assert response.status_code == 409
+    assert response.json()["detail"]["offset"] == middle
+    response = client.post(f"/api/admin/media/uploads/{upload_id}/complete", headers=admin_headers)
+    assert response.status_code == 409
+    assert response.json()["detail"]["offset"] == middle
+
+    assert client.get(f"/api/admin/media/uploads/{upload_id}", headers=admin_headers).json()["offset"] == middle
+    assert put_chunk(client, admin_headers, upload_id, middle, data[middle:]).json()["offset"] == len(data)
+    response = client.post(f"/api/admin/media/uploads/{upload_id}/complete", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    media = response.json()
+    assert media["content_hash"] == hashlib.sha256(data).hexdigest()
+    assert client.get(media["file_path"]).content == data
+    assert client.get(f"/api/admin/media/uploads/{upload_id}", headers=admin_headers).status_code == 404
+
+
+def test_chunk_past_the_declared_size_is_discarded(client, admin_headers, storage):
+    upload_id = start_session(client, admin_headers, b"0123456789")
+    assert put_chunk(client, admin_headers, upload_id, 0, b"01234").status_code == 200
+    response = put_chunk(client, admin_headers, upload_id, 5, b"56789AB")
+    assert response.status_code == 400
+    session = client.get(f"/api/admin/media/uploads/{upload_id}", headers=admin_headers).json()
+    assert session["offset"] == 5
+    assert put_chunk(client, admin_headers, upload_id, 5, b"56789").json()["offset"] == 10
+
+
+def test_oversized_sessions_are_refused(client, admin_headers, storage, monkeypatch):
+    monkeypatch.setattr(server, "MAX_UPLOAD_SIZE", 8)
+    response = client.post(
+        "/api/admin/media/uploads",
+        json={"filename": "big.png", "content_type": "image/png", "total_size": 9},
+        headers=admin_headers,
+    )
+    assert response.status_code == 413
+    response = client.post(
+        "/api/admin/media/uploads",
+        json={"filename": "empty.png", "content_type": "image/png", "total_size": 0},
+        headers=admin_headers,
+    )
+    assert response.status_code == 400
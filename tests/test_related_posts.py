@@ -0,0 +1,41 @@
+import time
+
+import server
+
+TOPICS = ["climate adaptation policy", "digital rights privacy", "gender equality law", "anti corruption courts"]
+
+
+def test_rebuilds_never_overlap_and_match_a_fresh_index(client, run, create_post, monkeypatch):
+    monkeypatch.setattr(server, "RELATED_REBUILD_AFTER_WRITES", 1)
+    build = server.build_related_posts_index
+    active, calls = [], []
+
+    def slow_build(counts, tag_sets):
+        active.append(1)
+        calls.append(len(active))
+        time.sleep(0.05)
+        try:
+            return build(counts, tag_sets)
+        finally:
+            active.pop()
+
+    monkeypatch.setattr(server, "build_related_posts_index", slow_build)
+    posts = [
+        create_post(title=f"{TOPICS[i % 4]} {i}", content=TOPICS[i % 4], tags=[TOPICS[i % 4].split()[0]], published=True)
+        for i in range(12)
+    ]
+    while server.related_rebuild_task is not None and not server.related_rebuild_task.done():
+        time.sleep(0.01)
+
+    assert max(calls) == 1
+    assert len(calls) < len(posts)
+
+    # With no writes in flight a rebuild is installed, and it matches an index built from scratch
+    run(server.refresh_related_posts_index)
+    expected = server.related_posts_index.neighbors
+    run(server.load_related_posts_index)
+    for post in posts:
+        fresh = server.related_posts_index.neighbors[post["id"]]
+        assert {neighbor: round(score, 6) for neighbor, score in expected[post["id"]]} == {
+            neighbor: round(score, 6) for neighbor, score in fresh
+        }